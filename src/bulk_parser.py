@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import List, Optional, Sequence, Tuple
+
+from models.course import Course
+from parser import HTMLToCourseParser
+
+
+class InputKind(StrEnum):
+    FRAGMENT = "fragment"
+    PAGE = "page"
+
+
+@dataclass(frozen=True)
+class ParseOutcome:
+    index: int
+    courses: List[Course] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def parse_in_parallel(
+    items: Sequence[str],
+    kind: InputKind = InputKind.PAGE,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> List[ParseOutcome]:
+    if not items:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # a few chunks per worker keeps the pool busy without drowning it in pickling
+        chunksize = max(1, math.ceil(len(items) / (workers * 4)))
+
+    chunks = [
+        [(i, items[i]) for i in range(start, min(start + chunksize, len(items)))]
+        for start in range(0, len(items), chunksize)
+    ]
+
+    if workers == 1:
+        return [outcome for chunk in chunks for outcome in _parse_chunk(chunk, kind)]
+
+    outcomes: List[ParseOutcome] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map hands results back in submission order, so input order is preserved
+        for chunk_outcomes in executor.map(
+            _parse_chunk, chunks, [kind] * len(chunks)
+        ):
+            outcomes.extend(chunk_outcomes)
+
+    return outcomes
+
+
+def _parse_chunk(chunk: List[Tuple[int, str]], kind: InputKind) -> List[ParseOutcome]:
+    return [_parse_item(index, item, kind) for index, item in chunk]
+
+
+def _parse_item(index: int, item: str, kind: InputKind) -> ParseOutcome:
+    try:
+        match kind:
+            case InputKind.FRAGMENT:
+                course = HTMLToCourseParser.parse_raw_html(item)
+                if course is None:
+                    return ParseOutcome(
+                        index=index,
+                        error="Fragment has no course header or enrollment status",
+                    )
+                return ParseOutcome(index=index, courses=[course])
+            case InputKind.PAGE:
+                courses = HTMLToCourseParser.parse_page(item)
+                if not courses:
+                    return ParseOutcome(index=index, error="No courses found on page")
+                return ParseOutcome(index=index, courses=courses)
+    except Exception as e:
+        return ParseOutcome(index=index, error=f"{type(e).__name__}: {str(e)}")
+
+
+def test() -> None:
+    import time
+
+    from synthetic_schedule import generate_schedule_page
+
+    pages = [
+        generate_schedule_page(courses=8, batches=2, timing_lines=2, seed=seed)
+        for seed in range(16)
+    ]
+    pages = pages * 25
+    pages.insert(3, "<html><body>maintenance page</body></html>")
+
+    for workers in sorted({1, os.cpu_count() or 1}):
+        started_at = time.perf_counter()
+        outcomes = parse_in_parallel(pages, kind=InputKind.PAGE, workers=workers)
+        elapsed = time.perf_counter() - started_at
+
+        failures = [o for o in outcomes if not o.ok]
+        in_order = [o.index for o in outcomes] == list(range(len(pages)))
+        print(
+            f"{workers} worker(s): {len(pages)} page(s) in {elapsed:.2f}s "
+            f"({len(pages) / elapsed:.0f} pages/s), in order: {in_order}, "
+            f"failures: {[(o.index, o.error) for o in failures]}"
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import functools
+import json
+import threading
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+from typing import Any, Dict, Final, Optional
+
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from tracing import span
+
+API_NAME: Final[str] = "calendar"
+API_VERSION: Final[str] = "v3"
+DISCOVERY_URL: Final[str] = (
+    f"https://www.googleapis.com/discovery/v1/apis/{API_NAME}/{API_VERSION}/rest"
+)
+DISCOVERY_CACHE_PATH: Final[Path] = Path("data/cache/discovery")
+
+
+class DiscoverySource(StrEnum):
+    BUNDLED = "bundled"
+    DISK = "disk"
+    NETWORK = "network"
+
+
+@dataclass(frozen=True)
+class DiscoveryDocument:
+    content: Dict[str, Any]
+    source: DiscoverySource
+    load_sec: float
+
+
+@dataclass
+class ServiceMetrics:
+    builds: int = 0
+    total_build_sec: float = 0.0
+    max_build_sec: float = 0.0
+
+    @property
+    def mean_build_sec(self) -> float:
+        return self.total_build_sec / self.builds if self.builds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.builds} service build(s), mean {self.mean_build_sec * 1000:.1f} ms, "
+            f"max {self.max_build_sec * 1000:.1f} ms"
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def load_discovery_document(cache_dir: Path = DISCOVERY_CACHE_PATH) -> DiscoveryDocument:
+    # parsed once per process, every service built afterwards shares it
+    started_at = time.perf_counter()
+
+    raw = get_static_doc(API_NAME, API_VERSION)
+    source = DiscoverySource.BUNDLED
+
+    cache_path = cache_dir / f"{API_NAME}.{API_VERSION}.json"
+    if raw is None and cache_path.exists():
+        raw = cache_path.read_text(encoding="utf-8")
+        source = DiscoverySource.DISK
+
+    if raw is None:
+        # only reached when the installed client ships no copy for this api
+        response, content = httplib2.Http(timeout=15).request(DISCOVERY_URL)
+        if response.status != 200:
+            raise RuntimeError(
+                f"Failed to fetch discovery document. Recieved HTTP {response.status}"
+            )
+        raw = content.decode("utf-8")
+        source = DiscoverySource.NETWORK
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(raw, encoding="utf-8")
+
+    return DiscoveryDocument(
+        content=json.loads(raw),
+        source=source,
+        load_sec=time.perf_counter() - started_at,
+    )
+
+
+class CalendarServiceFactory:
+    def __init__(
+        self, credentials: Credentials, document: Optional[DiscoveryDocument] = None
+    ) -> None:
+        self.credentials = credentials
+        self.document = document or load_discovery_document()
+        self.metrics = ServiceMetrics()
+
+        # a service wraps an httplib2 connection, which must not cross threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get(self):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+            service = self._build(http)
+            self._local.service = service
+            self._local.http = http
+        return service
+
+    # the authorized connection the calling thread's service was built with
+    def http(self) -> AuthorizedHttp:
+        self.get()
+        return self._local.http
+
+    def _build(self, http: AuthorizedHttp):
+        started_at = time.perf_counter()
+        with span("service_build", "sync"):
+            service = build_from_document(self.document.content, http=http)
+        elapsed = time.perf_counter() - started_at
+
+        with self._lock:
+            self.metrics.builds += 1
+            self.metrics.total_build_sec += elapsed
+            self.metrics.max_build_sec = max(self.metrics.max_build_sec, elapsed)
+
+        return service
+
+    def summary(self) -> str:
+        return (
+            f"discovery {self.document.source} in {self.document.load_sec * 1000:.1f} ms, "
+            f"{self.metrics.summary()}"
+        )
+
+
+_FACTORIES: Dict[str, CalendarServiceFactory] = {}
+_FACTORIES_LOCK: Final[threading.Lock] = threading.Lock()
+
+
+def get_service_factory(key: str, credentials: Credentials) -> CalendarServiceFactory:
+    # one factory per oauth token, so repeated syncs in a process reuse built services
+    with _FACTORIES_LOCK:
+        factory = _FACTORIES.get(key)
+        if factory is None or not factory.credentials.valid:
+            factory = CalendarServiceFactory(credentials)
+            _FACTORIES[key] = factory
+        return factory
+
+
+def test() -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    credentials = Credentials(token="stub-token")
+
+    started_at = time.perf_counter()
+    document = load_discovery_document()
+    print(
+        f"Discovery document from {document.source} in {document.load_sec * 1000:.1f} ms, "
+        f"cached lookup in {(time.perf_counter() - started_at) * 1000:.1f} ms total"
+    )
+
+    factory = get_service_factory("stub", credentials)
+    print(f"Same factory on reuse: {factory is get_service_factory('stub', credentials)}")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        services = list(executor.map(lambda _: id(factory.get()), range(16)))
+    print(f"Distinct services across 4 threads: {len(set(services))}")
+    print(f"Same service on one thread: {factory.get() is factory.get()}")
+    print(factory.summary())
+
+
+if __name__ == "__main__":
+    test()
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import dotenv
+import functools
 import os
 import tomllib
 from dataclasses import dataclass, field
-from datetime import date, timedelta
+from datetime import date
 from pathlib import Path
-from typing import Dict, Final, List, Optional
+from typing import Dict, Final, List, Optional, Union
+
+from exclusions import ExclusionIndex
 
 
 @dataclass(frozen=True)
@@ -61,6 +64,16 @@ class GoogleOAuthConfig:
 
 
 DEFAULT_RUN_HEADLESS_BROWSER_INSTANCE: Final[bool] = True
+DEFAULT_CALENDAR_REQUESTS_PER_SECOND: Final[float] = 5.0
+DEFAULT_CALENDAR_MAX_IN_FLIGHT: Final[int] = 4
+DEFAULT_SCRAPER_BACKEND: Final[str] = "http"
+SCRAPER_BACKENDS: Final[List[str]] = ["http", "browser"]
+DEFAULT_SCRAPER_PROFILE: Final[str] = "lean"
+SCRAPER_PROFILES: Final[List[str]] = ["lean", "full"]
+DEFAULT_SCRAPE_SNAPSHOT_TTL_MINUTES: Final[float] = 30.0
+DEFAULT_METRICS_TEXTFILE: Final[str] = "data/metrics/unisync.prom"
+DEFAULT_WATCH_INTERVAL_MINUTES: Final[float] = 60.0
+DEFAULT_WATCH_JITTER_MINUTES: Final[float] = 5.0
 
 
 @dataclass(frozen=True)
@@ -68,10 +81,22 @@ class AppConfig:
     DEFAULT_START_DATE: date
     DEFAULT_END_DATE: date
     TIMEZONE: str
-    EXCLUDED_DATES: List[date] = field(default_factory=list)
+    EXCLUDED_DATES: ExclusionIndex = field(default_factory=ExclusionIndex)
     RUN_HEADLESS_BROWSER_INSTANCE: bool = field(
         default=DEFAULT_RUN_HEADLESS_BROWSER_INSTANCE
     )
+    CALENDAR_REQUESTS_PER_SECOND: float = field(
+        default=DEFAULT_CALENDAR_REQUESTS_PER_SECOND
+    )
+    CALENDAR_MAX_IN_FLIGHT: int = field(default=DEFAULT_CALENDAR_MAX_IN_FLIGHT)
+    SCRAPER_BACKEND: str = field(default=DEFAULT_SCRAPER_BACKEND)
+    SCRAPER_PROFILE: str = field(default=DEFAULT_SCRAPER_PROFILE)
+    SCRAPE_SNAPSHOT_TTL_MINUTES: float = field(
+        default=DEFAULT_SCRAPE_SNAPSHOT_TTL_MINUTES
+    )
+    METRICS_TEXTFILE: Optional[Path] = field(default=Path(DEFAULT_METRICS_TEXTFILE))
+    WATCH_INTERVAL_MINUTES: float = field(default=DEFAULT_WATCH_INTERVAL_MINUTES)
+    WATCH_JITTER_MINUTES: float = field(default=DEFAULT_WATCH_JITTER_MINUTES)
 
     @classmethod
     def from_toml(cls, path: Path = Path("app_config.toml")) -> AppConfig:
@@ -100,14 +125,77 @@ class AppConfig:
                 "default_end_date",
             ),
             TIMEZONE=timezone,
-            EXCLUDED_DATES=_parse_excluded_dates(config.get("excluded_dates", [])),
+            EXCLUDED_DATES=_parse_excluded_dates(
+                config.get("excluded_dates", []), config.get("holiday_files", [])
+            ),
             RUN_HEADLESS_BROWSER_INSTANCE=_parse_bool(
                 config.get("run_headless_browser_instance"),
                 "run_headless_browser_instance",
             ),
+            CALENDAR_REQUESTS_PER_SECOND=float(
+                _parse_positive_number(
+                    config.get("calendar_requests_per_second"),
+                    "calendar_requests_per_second",
+                    DEFAULT_CALENDAR_REQUESTS_PER_SECOND,
+                )
+            ),
+            CALENDAR_MAX_IN_FLIGHT=int(
+                _parse_positive_number(
+                    config.get("calendar_max_in_flight"),
+                    "calendar_max_in_flight",
+                    DEFAULT_CALENDAR_MAX_IN_FLIGHT,
+                    integer=True,
+                )
+            ),
+            SCRAPER_BACKEND=_parse_choice(
+                config.get("scraper_backend"),
+                "scraper_backend",
+                SCRAPER_BACKENDS,
+                DEFAULT_SCRAPER_BACKEND,
+            ),
+            SCRAPER_PROFILE=_parse_choice(
+                config.get("scraper_profile"),
+                "scraper_profile",
+                SCRAPER_PROFILES,
+                DEFAULT_SCRAPER_PROFILE,
+            ),
+            SCRAPE_SNAPSHOT_TTL_MINUTES=float(
+                _parse_positive_number(
+                    config.get("scrape_snapshot_ttl_minutes"),
+                    "scrape_snapshot_ttl_minutes",
+                    DEFAULT_SCRAPE_SNAPSHOT_TTL_MINUTES,
+                    allow_zero=True,
+                )
+            ),
+            METRICS_TEXTFILE=_parse_optional_path(
+                config.get("metrics_textfile"),
+                "metrics_textfile",
+                DEFAULT_METRICS_TEXTFILE,
+            ),
+            WATCH_INTERVAL_MINUTES=float(
+                _parse_positive_number(
+                    config.get("watch_interval_minutes"),
+                    "watch_interval_minutes",
+                    DEFAULT_WATCH_INTERVAL_MINUTES,
+                )
+            ),
+            WATCH_JITTER_MINUTES=float(
+                _parse_positive_number(
+                    config.get("watch_jitter_minutes"),
+                    "watch_jitter_minutes",
+                    DEFAULT_WATCH_JITTER_MINUTES,
+                    allow_zero=True,
+                )
+            ),
         )
 
 
+@functools.lru_cache(maxsize=None)
+def get_app_config(path: Path = Path("app_config.toml")) -> AppConfig:
+    # every module shares one parsed config instead of re-reading the toml on import
+    return AppConfig.from_toml(path)
+
+
 def _parse_date(value: Optional[str], field_name: str) -> date:
     if not value:
         raise ValueError(f"Missing required config value: {field_name}")
@@ -130,48 +218,69 @@ def _parse_bool(value: Optional[bool], field_name: str) -> bool:
     return value
 
 
-def _parse_excluded_dates(excluded_dates: List[str]) -> List[date]:
-    result: List[date] = []
+def _parse_positive_number(
+    value: Optional[Union[int, float]],
+    field_name: str,
+    default: Union[int, float],
+    integer: bool = False,
+    allow_zero: bool = False,
+) -> Union[int, float]:
+    if value is None:
+        return default
 
-    for entry in excluded_dates:
-        entry = entry.strip()
+    expected = int if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, expected):
+        raise ValueError(f"Invalid numeric value for '{field_name}'")
 
-        if " - " in entry:
-            parts = entry.split(" - ")
-            if len(parts) != 2:
-                raise ValueError(f"Invalid date range format: '{entry}'")
+    if allow_zero and value < 0:
+        raise ValueError(f"'{field_name}' must not be negative")
+    if not allow_zero and value <= 0:
+        raise ValueError(f"'{field_name}' must be greater than zero")
 
-            try:
-                start_date = date.fromisoformat(parts[0].strip())
-                end_date = date.fromisoformat(parts[1].strip())
-            except ValueError as exc:
-                raise ValueError(
-                    f"Invalid date in range '{entry}'. Expected YYYY-MM-DD"
-                ) from exc
+    return value
+
+
+def _parse_choice(
+    value: Optional[str], field_name: str, choices: List[str], default: str
+) -> str:
+    if value is None:
+        return default
+
+    if value not in choices:
+        raise ValueError(
+            f"Invalid value for '{field_name}'. Expected one of: {', '.join(choices)}"
+        )
+
+    return value
+
+
+def _parse_optional_path(
+    value: Optional[str], field_name: str, default: str
+) -> Optional[Path]:
+    if value is None:
+        return Path(default)
+
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid path value for '{field_name}'")
+
+    # an empty string switches the feature off
+    return Path(value) if value else None
 
-            if start_date > end_date:
-                raise ValueError(
-                    f"Start date must be before or equal to end date in range: '{entry}'"
-                )
 
-            current = start_date
-            while current <= end_date:
-                result.append(current)
-                current += timedelta(days=1)
-        else:
-            try:
-                result.append(date.fromisoformat(entry))
-            except ValueError as exc:
-                raise ValueError(
-                    f"Invalid date format: '{entry}'. Expected YYYY-MM-DD"
-                ) from exc
+def _parse_excluded_dates(
+    excluded_dates: List[str], holiday_files: List[str]
+) -> ExclusionIndex:
+    if not isinstance(holiday_files, list):
+        raise ValueError("Invalid value for 'holiday_files'. Expected a list of paths")
 
-    return sorted(set(result))
+    index = ExclusionIndex.from_entries(excluded_dates)
+    return index.union(*(ExclusionIndex.from_file(Path(p)) for p in holiday_files))
 
 
 def test() -> None:
-    app_config = AppConfig.from_toml()
+    app_config = get_app_config()
     print(app_config)
+    print(f"Loaded once and shared: {app_config is get_app_config()}")
 
 
 if __name__ == "__main__":
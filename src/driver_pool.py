@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Final, Iterator, List, Optional
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+ERP_ORIGIN: Final[str] = "https://prodweb.snu.in"
+
+
+@dataclass
+class PoolMetrics:
+    launches: int = 0
+    recycles: int = 0
+    crashes: int = 0
+    acquisitions: int = 0
+    total_wait_sec: float = 0.0
+    max_wait_sec: float = 0.0
+
+    @property
+    def mean_wait_sec(self) -> float:
+        if not self.acquisitions:
+            return 0.0
+        return self.total_wait_sec / self.acquisitions
+
+    def summary(self) -> str:
+        return (
+            f"{self.acquisitions} acquisition(s), {self.launches} launch(es), "
+            f"{self.recycles} recycle(s), {self.crashes} crash(es), "
+            f"wait mean {self.mean_wait_sec:.2f}s / max {self.max_wait_sec:.2f}s"
+        )
+
+
+@dataclass
+class _PooledDriver:
+    driver: WebDriver
+    uses: int = 0
+
+
+class ChromeDriverPool:
+    def __init__(
+        self,
+        driver_factory: Callable[[], WebDriver],
+        size: int = 2,
+        max_uses: int = 20,
+        acquire_timeout_sec: float = 300,
+    ) -> None:
+        if size < 1:
+            raise ValueError(f"size must be at least 1. Recieved {size}")
+        if max_uses < 1:
+            raise ValueError(f"max_uses must be at least 1. Recieved {max_uses}")
+
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout_sec = acquire_timeout_sec
+        self.metrics = PoolMetrics()
+
+        # used as a stack, so the most recently used browser is handed out first
+        self._idle: List[_PooledDriver] = []
+        self._cond = threading.Condition()
+        self._live = 0
+        self._closed = False
+
+    @contextmanager
+    def acquire(self) -> Iterator[WebDriver]:
+        pooled = self._checkout()
+        crashed = False
+
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            crashed = True
+            raise
+        finally:
+            pooled.uses += 1
+            self._checkin(pooled, crashed)
+
+    def warm_up(self) -> None:
+        with self._cond:
+            missing = self.size - self._live
+            self._live += missing
+
+        launched: List[_PooledDriver] = []
+        try:
+            for _ in range(missing):
+                launched.append(self._launch())
+        finally:
+            # browsers that did start are kept, slots for the ones that did not are freed
+            with self._cond:
+                self._live -= missing - len(launched)
+                self._idle.extend(launched)
+                self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+
+        for pooled in idle:
+            self._discard(pooled)
+
+    def __enter__(self) -> ChromeDriverPool:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _checkout(self) -> _PooledDriver:
+        started_at = time.perf_counter()
+        deadline = started_at + self.acquire_timeout_sec
+        pooled: Optional[_PooledDriver] = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._live < self.size:
+                    self._live += 1
+                    break
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise RuntimeError("Timed out waiting for a pooled browser")
+                self._cond.wait(remaining)
+
+        if pooled is None:
+            try:
+                pooled = self._launch()
+            except Exception:
+                with self._cond:
+                    self._live -= 1
+                    self._cond.notify()
+                raise
+
+        waited = time.perf_counter() - started_at
+        with self._cond:
+            self.metrics.acquisitions += 1
+            self.metrics.total_wait_sec += waited
+            self.metrics.max_wait_sec = max(self.metrics.max_wait_sec, waited)
+
+        return pooled
+
+    def _checkin(self, pooled: _PooledDriver, crashed: bool) -> None:
+        if not crashed and pooled.uses < self.max_uses:
+            try:
+                self._reset(pooled.driver)
+            except WebDriverException:
+                crashed = True
+            else:
+                with self._cond:
+                    if not self._closed:
+                        self._idle.append(pooled)
+                        self._cond.notify()
+                        return
+
+        with self._cond:
+            if crashed:
+                self.metrics.crashes += 1
+            elif not self._closed:
+                self.metrics.recycles += 1
+
+        self._discard(pooled)
+
+    def _launch(self) -> _PooledDriver:
+        driver = self.driver_factory()
+        with self._cond:
+            self.metrics.launches += 1
+        return _PooledDriver(driver=driver)
+
+    def _discard(self, pooled: _PooledDriver) -> None:
+        # free the slot first so a waiting scrape can launch a replacement
+        with self._cond:
+            self._live -= 1
+            self._cond.notify()
+
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, driver: WebDriver) -> None:
+        # drop every trace of the previous account before the next scrape
+        for handle in driver.window_handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+
+        driver.get("about:blank")
+        driver.delete_all_cookies()
+        execute_cdp_cmd = getattr(driver, "execute_cdp_cmd", None)
+        if execute_cdp_cmd is not None:
+            execute_cdp_cmd("Network.clearBrowserCookies", {})
+            execute_cdp_cmd(
+                "Storage.clearDataForOrigin",
+                {"origin": ERP_ORIGIN, "storageTypes": "all"},
+            )
+
+
+def test() -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    class FakeDriver:
+        def __init__(self) -> None:
+            self.window_handles = ["main"]
+            self.switch_to = self
+            self.cookies = 0
+
+        def window(self, handle: str) -> None:
+            pass
+
+        def get(self, url: str) -> None:
+            time.sleep(0.01)
+
+        def delete_all_cookies(self) -> None:
+            self.cookies = 0
+
+        def quit(self) -> None:
+            pass
+
+    def fake_factory() -> WebDriver:
+        # stands in for the seconds a real chrome launch takes
+        time.sleep(0.2)
+        return FakeDriver()  # type: ignore[return-value]
+
+    def scrape(pool: ChromeDriverPool, crash: bool) -> None:
+        try:
+            with pool.acquire() as driver:
+                driver.get("https://example.com")
+                if crash:
+                    raise WebDriverException("tab crashed")
+        except WebDriverException:
+            pass
+
+    with ChromeDriverPool(fake_factory, size=3, max_uses=5) as pool:
+        pool.warm_up()
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            for i in range(40):
+                executor.submit(scrape, pool, i % 13 == 0)
+
+        print(f"Pool metrics: {pool.metrics.summary()}")
+
+    launches = 0
+
+    def flaky_factory() -> WebDriver:
+        nonlocal launches
+        launches += 1
+        if launches == 2:
+            raise WebDriverException("chrome failed to start")
+        return FakeDriver()  # type: ignore[return-value]
+
+    with ChromeDriverPool(flaky_factory, size=3, acquire_timeout_sec=1) as pool:
+        try:
+            pool.warm_up()
+        except WebDriverException as e:
+            print(f"Warm-up failed: {e.msg}")
+        # the failed launch must not leave the pool thinking it is full
+        with pool.acquire(), pool.acquire(), pool.acquire():
+            print(f"After a failed warm-up: {pool.metrics.summary()}")
+
+
+if __name__ == "__main__":
+    test()
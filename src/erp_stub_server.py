@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Final, Optional
+from urllib.parse import parse_qs
+
+SAMPLE_SCHED_PATH: Final[Path] = Path("data/sample/sample-weekly-sched.html")
+
+LOGIN_PATH: Final[str] = "/psp/CSPROD/EMPLOYEE/HRMS/?cmd=login"
+SCHEDULE_PATH: Final[str] = (
+    "/psc/CSPROD/EMPLOYEE/HRMS/c/SA_LEARNER_SERVICES.SSR_SSENRL_LIST.GBL"
+)
+SESSION_COOKIE: Final[str] = "PS_TOKEN"
+
+# trimmed down copy of the peoplesoft sign-in form, hidden fields included
+LOGIN_FORM: Final[str] = """<html><body>
+<form action="?cmd=login&amp;languageCd=ENG" method="post" name="login">
+<input type="hidden" name="timezoneOffset" value="0">
+<input type="hidden" name="ptmode" value="f">
+<input type="hidden" name="ptlangcd" value="ENG">
+<input type="text" id="userid" name="userid" value="">
+<input type="password" id="pwd" name="pwd" value="">
+<input type="submit" class="psloginbutton" name="Submit" value="Sign In">
+</form>
+</body></html>"""
+
+
+# local stand-in for the SNU PeopleSoft ERP that serves the sample weekly schedule
+class ERPStubServer:
+    def __init__(
+        self,
+        netid: str = "stub",
+        password: str = "stub",
+        schedule_path: Path = SAMPLE_SCHED_PATH,
+    ) -> None:
+        self.netid = netid
+        self.password = password
+        self.schedule_html = schedule_path.read_text(encoding="utf-8")
+        self.login_attempts = 0
+        # tcp connections accepted, lets callers check that keep-alive pooling works
+        self.connections = 0
+        self._sessions: set[str] = set()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Stub server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self) -> str:
+        return self.base_url + LOGIN_PATH
+
+    @property
+    def schedule_url(self) -> str:
+        return self.base_url + SCHEDULE_PATH
+
+    def start(self) -> ERPStubServer:
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> ERPStubServer:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive like the real erp, every response carries a content length
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                stub.connections += 1
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path == LOGIN_PATH:
+                    self._send(200, LOGIN_FORM)
+                elif self._session() not in stub._sessions:
+                    self._redirect(LOGIN_PATH)
+                elif self.path == SCHEDULE_PATH:
+                    self._send(200, stub.schedule_html)
+                else:
+                    self._send(200, "<html><body>Home</body></html>")
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                stub.login_attempts += 1
+
+                userid = form.get("userid", [""])[0]
+                pwd = form.get("pwd", [""])[0]
+                if userid != stub.netid or pwd != stub.password:
+                    self._send(200, LOGIN_FORM)
+                    return
+
+                token = secrets.token_hex(8)
+                stub._sessions.add(token)
+                self.send_response(302)
+                self.send_header("Location", "/psp/CSPROD/EMPLOYEE/HRMS/h/?tab=DEFAULT")
+                self.send_header("Set-Cookie", f"{SESSION_COOKIE}={token}; Path=/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _session(self) -> str:
+                for part in self.headers.get("Cookie", "").split(";"):
+                    name, _, value = part.strip().partition("=")
+                    if name == SESSION_COOKIE:
+                        return value
+                return ""
+
+            def _redirect(self, location: str) -> None:
+                self.send_response(302)
+                self.send_header("Location", location)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _send(self, status: int, body: str) -> None:
+                encoded = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+        return Handler
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Final, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from sync_state import OperationResult, SyncOperation
+from metrics import API_CALL_SECONDS, API_CALLS, API_RETRIES, http_status_label
+from tracing import span
+
+RETRYABLE_STATUSES: Final[frozenset[int]] = frozenset({429, 500, 502, 503, 504})
+# 403 is only worth retrying when google says it was a quota problem
+RETRYABLE_403_REASONS: Final[frozenset[str]] = frozenset(
+    {"rateLimitExceeded", "userRateLimitExceeded"}
+)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, capacity: Optional[float] = None) -> None:
+        if rate_per_sec <= 0:
+            raise ValueError(f"rate_per_sec must be positive. Recieved {rate_per_sec}")
+
+        self.rate_per_sec = rate_per_sec
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_sec)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated_at) * self.rate_per_sec,
+                )
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait_sec = (1 - self._tokens) / self.rate_per_sec
+
+            time.sleep(wait_sec)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 6
+    base_delay_sec: float = 1.0
+    max_delay_sec: float = 32.0
+
+    def delay(self, attempt: int) -> float:
+        # full jitter keeps concurrent workers from retrying in lockstep
+        ceiling = min(self.max_delay_sec, self.base_delay_sec * (2**attempt))
+        return random.uniform(0, ceiling)
+
+
+@dataclass
+class WriteReport:
+    succeeded: int = 0
+    retries: int = 0
+    failed: List[OperationResult] = field(default_factory=list)
+    elapsed_sec: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.succeeded} succeeded, {len(self.failed)} failed, "
+            f"{self.retries} retried in {self.elapsed_sec:.1f}s"
+        )
+
+
+class ConcurrentEventWriter:
+    def __init__(
+        self,
+        request_factory: Callable[[SyncOperation], Any],
+        http_factory: Callable[[], Any],
+        max_in_flight: int = 4,
+        limiter: Optional[TokenBucket] = None,
+        retry_policy: RetryPolicy = RetryPolicy(),
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1. Recieved {max_in_flight}")
+
+        self.request_factory = request_factory
+        self.http_factory = http_factory
+        self.max_in_flight = max_in_flight
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+
+        # httplib2 connections are not thread safe, so every worker gets its own
+        self._local = threading.local()
+        self._retry_lock = threading.Lock()
+        self._retries = 0
+
+    def write(
+        self,
+        operations: List[SyncOperation],
+        on_result: Callable[[OperationResult], None],
+    ) -> WriteReport:
+        report = WriteReport()
+        self._retries = 0
+        started_at = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = [executor.submit(self._execute, op) for op in operations]
+
+            # results are handed back on the calling thread, so callers need no locking
+            for future in as_completed(futures):
+                result = future.result()
+                on_result(result)
+
+                if result.ok:
+                    report.succeeded += 1
+                else:
+                    report.failed.append(result)
+
+        report.retries = self._retries
+        report.elapsed_sec = time.perf_counter() - started_at
+        return report
+
+    def _http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self.http_factory()
+            self._local.http = http
+        return http
+
+    def _execute(self, operation: SyncOperation) -> OperationResult:
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                with span("rate_limit_wait", "sync"):
+                    self.limiter.acquire()
+
+            try:
+                request = self.request_factory(operation)
+                with (
+                    span(
+                        f"calendar_{operation.kind}",
+                        "sync",
+                        key=operation.key,
+                        attempt=attempt,
+                    ),
+                    API_CALL_SECONDS.time(operation=operation.kind),
+                ):
+                    response = request.execute(http=self._http())
+                API_CALLS.inc(operation=operation.kind, status="200")
+                return OperationResult(operation=operation, response=response)
+            except Exception as e:
+                status = http_status_label(e)
+                API_CALLS.inc(operation=operation.kind, status=status)
+
+                attempt += 1
+                if attempt >= self.retry_policy.max_attempts or not is_retryable(e):
+                    return OperationResult(operation=operation, error=e)
+
+                API_RETRIES.inc(status=status)
+                with self._retry_lock:
+                    self._retries += 1
+                time.sleep(self.retry_policy.delay(attempt))
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status in RETRYABLE_STATUSES:
+            return True
+        if status == 403:
+            return _error_reason(error) in RETRYABLE_403_REASONS
+        return False
+
+    # dropped connections and timeouts on the way to google
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def _error_reason(error: HttpError) -> Optional[str]:
+    details = getattr(error, "error_details", None)
+    if isinstance(details, list):
+        for detail in details:
+            if isinstance(detail, dict) and "reason" in detail:
+                return detail["reason"]
+    return None
+
+
+def test() -> None:
+    import httplib2
+
+    from sync_state import OperationKind
+
+    class FlakyRequest:
+        def __init__(self, attempts: List[int]) -> None:
+            self.attempts = attempts
+
+        def execute(self, http=None) -> dict:
+            self.attempts[0] += 1
+            if self.attempts[0] < 3:
+                resp = httplib2.Response({"status": 429})
+                raise HttpError(resp, b'{"error": {"message": "rate limited"}}')
+            return {"id": "ok"}
+
+    counters = {}
+
+    def request_factory(op: SyncOperation) -> FlakyRequest:
+        return FlakyRequest(counters.setdefault(op.key, [0]))
+
+    operations = [
+        SyncOperation(kind=OperationKind.INSERT, key=f"event-{i}", body={})
+        for i in range(20)
+    ]
+
+    writer = ConcurrentEventWriter(
+        request_factory=request_factory,
+        http_factory=lambda: None,
+        max_in_flight=8,
+        limiter=TokenBucket(rate_per_sec=50),
+        retry_policy=RetryPolicy(base_delay_sec=0.05, max_delay_sec=0.2),
+    )
+    report = writer.write(operations, on_result=lambda result: None)
+    print(f"Write report: {report.summary()}")
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import tomllib
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Collection, Iterable, Iterator, List, Optional, Tuple
+
+ONE_DAY = timedelta(days=1)
+
+
+class ExclusionIndex:
+    # excluded days kept as merged, sorted [start, end] intervals instead of one date per day
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, ranges: Iterable[Tuple[date, date]] = ()) -> None:
+        merged: List[List[date]] = []
+        for start, end in sorted(ranges):
+            if start > end:
+                raise ValueError(
+                    f"Start date must be before or equal to end date in range: '{start} - {end}'"
+                )
+            # overlapping and back-to-back ranges collapse into one interval
+            if merged and start <= merged[-1][1] + ONE_DAY:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        self._starts: Tuple[date, ...] = tuple(r[0] for r in merged)
+        self._ends: Tuple[date, ...] = tuple(r[1] for r in merged)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[str]) -> ExclusionIndex:
+        return cls(parse_exclusion_entry(entry) for entry in entries)
+
+    @classmethod
+    def from_file(cls, path: Path) -> ExclusionIndex:
+        # holiday files use the same entry syntax as excluded_dates in app_config.toml
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+
+        entries = data.get("excluded_dates")
+        if not isinstance(entries, list):
+            raise ValueError(f"Holiday file must define an excluded_dates list: {path}")
+
+        return cls.from_entries(entries)
+
+    def union(self, *others: ExclusionIndex) -> ExclusionIndex:
+        return ExclusionIndex(r for index in (self, *others) for r in index.ranges)
+
+    @property
+    def ranges(self) -> List[Tuple[date, date]]:
+        return list(zip(self._starts, self._ends))
+
+    def __contains__(self, day: object) -> bool:
+        if not isinstance(day, date):
+            return False
+        i = bisect.bisect_right(self._starts, day) - 1
+        return i >= 0 and day <= self._ends[i]
+
+    def __iter__(self) -> Iterator[date]:
+        for start, end in zip(self._starts, self._ends):
+            current = start
+            while current <= end:
+                yield current
+                current += ONE_DAY
+
+    def __len__(self) -> int:
+        return sum((end - start).days + 1 for start, end in zip(self._starts, self._ends))
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ExclusionIndex):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __hash__(self) -> int:
+        return hash((self._starts, self._ends))
+
+    def __repr__(self) -> str:
+        return f"ExclusionIndex({len(self._starts)} range(s), {len(self)} day(s))"
+
+    def dates_between(
+        self, start: date, end: date, weekdays: Optional[Collection[int]] = None
+    ) -> Iterator[date]:
+        # first interval that has not ended before the window opens
+        i = bisect.bisect_left(self._ends, start)
+
+        while i < len(self._starts) and self._starts[i] <= end:
+            lo = max(self._starts[i], start)
+            hi = min(self._ends[i], end)
+
+            if weekdays is None:
+                current = lo
+                while current <= hi:
+                    yield current
+                    current += ONE_DAY
+            else:
+                # jump straight to each wanted weekday and step a week at a time
+                yield from heapq.merge(
+                    *(
+                        _weekly(lo + timedelta(days=(weekday - lo.weekday()) % 7), hi)
+                        for weekday in set(weekdays)
+                    )
+                )
+
+            i += 1
+
+
+def _weekly(first: date, last: date) -> Iterator[date]:
+    step = timedelta(days=7)
+    while first <= last:
+        yield first
+        first += step
+
+
+def parse_exclusion_entry(entry: str) -> Tuple[date, date]:
+    entry = entry.strip()
+
+    if " - " in entry:
+        parts = entry.split(" - ")
+        if len(parts) != 2:
+            raise ValueError(f"Invalid date range format: '{entry}'")
+
+        try:
+            start_date = date.fromisoformat(parts[0].strip())
+            end_date = date.fromisoformat(parts[1].strip())
+        except ValueError as exc:
+            raise ValueError(
+                f"Invalid date in range '{entry}'. Expected YYYY-MM-DD"
+            ) from exc
+
+        if start_date > end_date:
+            raise ValueError(
+                f"Start date must be before or equal to end date in range: '{entry}'"
+            )
+
+        return start_date, end_date
+
+    try:
+        day = date.fromisoformat(entry)
+    except ValueError as exc:
+        raise ValueError(f"Invalid date format: '{entry}'. Expected YYYY-MM-DD") from exc
+
+    return day, day
+
+
+def test() -> None:
+    import random
+    import time
+
+    index = ExclusionIndex.from_entries(
+        ["2026-01-26", "2026-02-20 - 2026-02-21", "2026-02-22", "2026-03-02 - 2026-03-10"]
+    )
+    print(index, index.ranges)
+    print(f"2026-02-22 excluded: {date(2026, 2, 22) in index}")
+    print(
+        "Mondays and Wednesdays excluded in term: "
+        f"{list(index.dates_between(date(2026, 1, 12), date(2026, 4, 28), {0, 2}))}"
+    )
+
+    # a decade of institutional calendar, checked against the old linear scan
+    rng = random.Random(0)
+    entries = []
+    for _ in range(800):
+        start = date(2020, 1, 1) + timedelta(days=rng.randint(0, 3650))
+        entries.append((start, start + timedelta(days=rng.choice([0, 0, 0, 1, 4]))))
+    big = ExclusionIndex(entries)
+    expanded = list(big)
+
+    windows = [
+        (date(2020, 1, 1) + timedelta(days=d), frozenset(rng.sample(range(6), 2)))
+        for d in range(0, 3500, 7)
+    ]
+
+    started_at = time.perf_counter()
+    linear = [
+        [d for d in expanded if s <= d <= s + timedelta(days=120) and d.weekday() in w]
+        for s, w in windows
+    ]
+    linear_sec = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    indexed = [list(big.dates_between(s, s + timedelta(days=120), w)) for s, w in windows]
+    indexed_sec = time.perf_counter() - started_at
+
+    print(
+        f"{len(big.ranges)} range(s) / {len(expanded)} day(s), {len(windows)} window(s): "
+        f"linear {linear_sec * 1000:.1f} ms, indexed {indexed_sec * 1000:.1f} ms, "
+        f"match: {linear == indexed}"
+    )
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from bs4 import BeautifulSoup
+from enum import StrEnum
+from typing import Dict, Final, List, Optional, Protocol, TYPE_CHECKING
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import get_app_config, ERPCredentials
+from parser import COURSE_DIV_SELECTOR
+from metrics import LOGIN_FAILURES, SCRAPE_SECONDS, SCRAPES
+from tracing import span
+
+if TYPE_CHECKING:
+    from driver_pool import ChromeDriverPool
+
+APP_CONFIG = get_app_config()
+
+USER_AGENT: Final[str] = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/131.0 Safari/537.36"
+)
+
+
+class _SharedHTTPAdapter(HTTPAdapter):
+    # closing a session must not clear a pool other scrapes and threads are using
+    def close(self) -> None:
+        pass
+
+
+# one connection pool shared by every scrape in the process, cookies stay per session
+_SHARED_ADAPTER: Final[HTTPAdapter] = _SharedHTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+)
+
+
+class ScraperBackend(StrEnum):
+    HTTP = "http"
+    BROWSER = "browser"
+
+
+class WeeklyScheduleScraper(Protocol):
+    def get_weekly_schedule_html(
+        self, credentials: Optional[ERPCredentials] = None
+    ) -> List[str]: ...
+
+
+class HTTPScrapeError(RuntimeError):
+    pass
+
+
+class HTTPERPScraper:
+    LOGIN_URL: Final[str] = "https://prodweb.snu.in/psp/CSPROD/EMPLOYEE/HRMS/?cmd=login"
+    WEEKLY_SCHEDULE_URL: Final[str] = (
+        "https://prodweb.snu.in/psc/CSPROD/EMPLOYEE/HRMS/c/SA_LEARNER_SERVICES.SSR_SSENRL_LIST.GBL"
+    )
+
+    def __init__(
+        self,
+        timeout_sec: int = 15,
+        fallback_to_browser: bool = True,
+        login_url: str = LOGIN_URL,
+        schedule_url: str = WEEKLY_SCHEDULE_URL,
+        driver_pool: Optional[ChromeDriverPool] = None,
+    ) -> None:
+        self.timeout_sec = timeout_sec
+        self.fallback_to_browser = fallback_to_browser
+        self.driver_pool = driver_pool
+        self.login_url = login_url
+        self.schedule_url = schedule_url
+        self.used_browser_fallback = False
+
+    def get_weekly_schedule_html(
+        self, credentials: Optional[ERPCredentials] = None
+    ) -> List[str]:
+        credentials = credentials or ERPCredentials.from_env()
+
+        try:
+            with (
+                span("http_scrape", "scrape"),
+                SCRAPE_SECONDS.time(backend="http"),
+                self._create_session() as session,
+            ):
+                with span("erp_login", "scrape"):
+                    self._login(session, credentials)
+                with span("get_course_divs", "scrape"):
+                    course_divs = self._get_course_divs(session)
+            SCRAPES.inc(backend="http", result="ok")
+            return course_divs
+        except (HTTPScrapeError, requests.RequestException) as exc:
+            SCRAPES.inc(backend="http", result="error")
+            if not self.fallback_to_browser:
+                raise
+
+            print(f"HTTP scrape failed ({str(exc)}), falling back to browser")
+            from scraper import SNUERPScraper
+
+            self.used_browser_fallback = True
+            browser_scraper = SNUERPScraper(driver_pool=self.driver_pool)
+            return browser_scraper.get_weekly_schedule_html(credentials)
+        except Exception:
+            SCRAPES.inc(backend="http", result="error")
+            raise
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers["User-Agent"] = USER_AGENT
+        session.mount("https://", _SHARED_ADAPTER)
+        session.mount("http://", _SHARED_ADAPTER)
+        return session
+
+    def _login(self, session: requests.Session, credentials: ERPCredentials) -> None:
+        response = session.get(self.login_url, timeout=self.timeout_sec)
+        response.raise_for_status()
+
+        soup = BeautifulSoup(response.text, "lxml")
+        userid_input = soup.find("input", id="userid")
+        form = userid_input.find_parent("form") if userid_input else None
+        if form is None:
+            raise HTTPScrapeError("Unable to locate the ERP login form")
+
+        payload: Dict[str, str] = {}
+        for field in form.find_all("input"):
+            name = field.get("name")
+            if name and field.get("type") != "submit":
+                payload[str(name)] = str(field.get("value") or "")
+
+        payload["userid"] = credentials.netid
+        payload["pwd"] = credentials.password
+
+        action = urljoin(response.url, str(form.get("action") or ""))
+        response = session.post(action, data=payload, timeout=self.timeout_sec)
+        response.raise_for_status()
+
+        # peoplesoft answers a bad sign-in by serving the login form again
+        if 'id="userid"' in response.text:
+            LOGIN_FAILURES.inc(backend="http")
+            raise RuntimeError("Login failed. Please verify your credentials.")
+
+    def _get_course_divs(self, session: requests.Session) -> List[str]:
+        with span("schedule_page_load", "scrape"):
+            response = session.get(self.schedule_url, timeout=self.timeout_sec)
+            response.raise_for_status()
+
+        with span("collect_course_divs", "scrape"):
+            soup = BeautifulSoup(response.text, "lxml")
+            course_divs = soup.select(COURSE_DIV_SELECTOR)
+        if not course_divs:
+            raise HTTPScrapeError("Unable to grab course schedule divs")
+
+        return [str(cd) for cd in course_divs]
+
+
+def create_scraper(
+    backend: ScraperBackend = ScraperBackend(APP_CONFIG.SCRAPER_BACKEND),
+    driver_pool: Optional[ChromeDriverPool] = None,
+) -> WeeklyScheduleScraper:
+    match backend:
+        case ScraperBackend.HTTP:
+            return HTTPERPScraper(driver_pool=driver_pool)
+        case ScraperBackend.BROWSER:
+            from scraper import SNUERPScraper
+
+            return SNUERPScraper(driver_pool=driver_pool)
+
+
+def test() -> None:
+    from erp_stub_server import ERPStubServer
+    from parser import HTMLToCourseParser
+
+    with ERPStubServer(netid="stub", password="stub") as server:
+        scraper = HTTPERPScraper(
+            fallback_to_browser=False,
+            login_url=server.login_url,
+            schedule_url=server.schedule_url,
+        )
+        schedule_html = scraper.get_weekly_schedule_html(
+            ERPCredentials(netid="stub", password="stub")
+        )
+
+        courses = [HTMLToCourseParser.parse_raw_html(raw) for raw in schedule_html]
+        print(f"Fetched {len(schedule_html)} course div(s) over HTTP")
+        print(f"Parsed {len([c for c in courses if c])} course(s)")
+
+        connections = server.connections
+        scraper.get_weekly_schedule_html(ERPCredentials(netid="stub", password="stub"))
+        print(f"Second scrape opened {server.connections - connections} new connection(s)")
+
+        try:
+            scraper.get_weekly_schedule_html(ERPCredentials(netid="stub", password="wrong"))
+        except RuntimeError as e:
+            print(f"Bad credentials rejected: {str(e)}")
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Union,
+)
+from zoneinfo import ZoneInfo
+
+from config import get_app_config
+from models.calendar_event import CalendarEvent, CompiledEvent
+
+APP_CONFIG = get_app_config()
+
+PRODUCT_ID: Final[str] = "-//UniSync//Course Calendar//EN"
+UID_DOMAIN: Final[str] = "unisync"
+# rfc 5545 caps content lines at 75 octets, excluding the line break
+MAX_LINE_OCTETS: Final[int] = 75
+CRLF: Final[str] = "\r\n"
+# events are buffered into chunks of this many lines before hitting the file
+WRITE_CHUNK_LINES: Final[int] = 2048
+
+
+def write_ics(
+    events: Iterable[Union[CalendarEvent, CompiledEvent]],
+    path: Path,
+    calendar_name: str = "UniSync",
+    tz_name: str = APP_CONFIG.TIMEZONE,
+) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # newline="" keeps python from rewriting the crlf line endings
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        return stream_ics(events, f, calendar_name, tz_name)
+
+
+def stream_ics(
+    events: Iterable[Union[CalendarEvent, CompiledEvent]],
+    out: TextIO,
+    calendar_name: str = "UniSync",
+    tz_name: str = APP_CONFIG.TIMEZONE,
+) -> int:
+    dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    buffer: List[str] = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODUCT_ID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(calendar_name)}",
+        f"X-WR-TIMEZONE:{tz_name}",
+    ]
+    buffer.extend(
+        vtimezone_lines(
+            tz_name,
+            APP_CONFIG.DEFAULT_START_DATE.year,
+            APP_CONFIG.DEFAULT_END_DATE.year,
+        )
+    )
+
+    count = 0
+    for event in events:
+        if isinstance(event, CompiledEvent):
+            key, body = event.key, event.body
+        else:
+            key, body = event.key, event.model_dump(mode="json")
+
+        buffer.extend(vevent_lines(key, body, dtstamp))
+        count += 1
+
+        # flush in chunks so memory stays flat however many events stream through
+        if len(buffer) >= WRITE_CHUNK_LINES:
+            _flush(buffer, out)
+
+    buffer.append("END:VCALENDAR")
+    _flush(buffer, out)
+    return count
+
+
+def _flush(buffer: List[str], out: TextIO) -> None:
+    out.write("".join(fold_line(line) + CRLF for line in buffer))
+    buffer.clear()
+
+
+def vevent_lines(key: str, body: Dict[str, Any], dtstamp: str) -> Iterator[str]:
+    summary = escape_text(body.get("summary", ""))
+
+    yield "BEGIN:VEVENT"
+    yield f"UID:{event_uid(key)}"
+    yield f"DTSTAMP:{dtstamp}"
+    yield _local_datetime_line("DTSTART", body["start"])
+    yield _local_datetime_line("DTEND", body["end"])
+    yield f"SUMMARY:{summary}"
+    if body.get("description"):
+        yield f"DESCRIPTION:{escape_text(body['description'])}"
+    if body.get("location"):
+        yield f"LOCATION:{escape_text(body['location'])}"
+
+    # the api strings are already valid ical, EXDATE even carries its TZID
+    yield from body.get("recurrence", [])
+
+    for override in body.get("reminders", {}).get("overrides", []):
+        yield "BEGIN:VALARM"
+        yield "ACTION:DISPLAY"
+        yield f"DESCRIPTION:{summary}"
+        yield f"TRIGGER:-PT{int(override['minutes'])}M"
+        yield "END:VALARM"
+
+    yield "END:VEVENT"
+
+
+def _local_datetime_line(name: str, value: Dict[str, str]) -> str:
+    local = datetime.fromisoformat(value["dateTime"]).replace(tzinfo=None)
+    return f"{name};TZID={value['timeZone']}:{local.strftime('%Y%m%dT%H%M%S')}"
+
+
+def event_uid(key: str) -> str:
+    # derived from the event key so re-exports update events instead of duplicating them
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return f"{digest}@{UID_DOMAIN}"
+
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    if len(line) <= MAX_LINE_OCTETS and line.isascii():
+        return line
+
+    # fold on octets but never inside a multi-byte utf-8 character
+    parts: List[str] = []
+    current: List[str] = []
+    size = 0
+    limit = MAX_LINE_OCTETS
+
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append("".join(current))
+            current, size = [], 0
+            # continuation lines start with a space, which eats one octet
+            limit = MAX_LINE_OCTETS - 1
+        current.append(char)
+        size += char_size
+
+    parts.append("".join(current))
+    return (CRLF + " ").join(parts)
+
+
+def vtimezone_lines(tz_name: str, first_year: int, last_year: int) -> List[str]:
+    tz = ZoneInfo(tz_name)
+    transitions = _find_transitions(tz, first_year, last_year)
+
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{tz_name}"]
+
+    if not transitions:
+        # fixed offset zones only need a single standard observance
+        start = datetime(first_year, 1, 1, tzinfo=tz)
+        offset = _format_offset(start.utcoffset())
+        lines += [
+            "BEGIN:STANDARD",
+            f"DTSTART:{first_year}0101T000000",
+            f"TZOFFSETFROM:{offset}",
+            f"TZOFFSETTO:{offset}",
+            f"TZNAME:{start.tzname()}",
+            "END:STANDARD",
+        ]
+    else:
+        for transition in transitions:
+            kind = "DAYLIGHT" if transition.is_dst else "STANDARD"
+            # observance starts are written in the local time in force before the change
+            local_start = transition.at_utc + transition.offset_from
+            lines += [
+                f"BEGIN:{kind}",
+                f"DTSTART:{local_start.strftime('%Y%m%dT%H%M%S')}",
+                f"TZOFFSETFROM:{_format_offset(transition.offset_from)}",
+                f"TZOFFSETTO:{_format_offset(transition.offset_to)}",
+                f"TZNAME:{transition.tz_abbreviation}",
+                f"END:{kind}",
+            ]
+
+    lines.append("END:VTIMEZONE")
+    return lines
+
+
+class _Transition(NamedTuple):
+    at_utc: datetime
+    offset_from: timedelta
+    offset_to: timedelta
+    tz_abbreviation: str
+    is_dst: bool
+
+
+def _find_transitions(tz: ZoneInfo, first_year: int, last_year: int) -> List[_Transition]:
+    transitions: List[_Transition] = []
+
+    current = datetime(first_year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(last_year + 1, 1, 1, tzinfo=timezone.utc)
+    step = timedelta(days=1)
+
+    def offset_at(moment: datetime) -> Optional[timedelta]:
+        return moment.astimezone(tz).utcoffset()
+
+    while current < end:
+        following = current + step
+        if offset_at(current) != offset_at(following):
+            # narrow the day down to the minute the offset changes
+            lo, hi = current, following
+            while hi - lo > timedelta(minutes=1):
+                mid = lo + (hi - lo) / 2
+                if offset_at(mid) == offset_at(lo):
+                    lo = mid
+                else:
+                    hi = mid
+
+            at_utc = hi.replace(second=0, microsecond=0)
+            after = at_utc.astimezone(tz)
+            transitions.append(
+                _Transition(
+                    at_utc=at_utc.replace(tzinfo=None),
+                    offset_from=offset_at(lo) or timedelta(0),
+                    offset_to=after.utcoffset() or timedelta(0),
+                    tz_abbreviation=after.tzname() or "",
+                    is_dst=bool(after.dst()),
+                )
+            )
+        current = following
+
+    return transitions
+
+
+def _format_offset(offset: Optional[timedelta]) -> str:
+    total_minutes = int((offset or timedelta(0)).total_seconds() // 60)
+    sign = "+" if total_minutes >= 0 else "-"
+    hours, minutes = divmod(abs(total_minutes), 60)
+    return f"{sign}{hours:02d}{minutes:02d}"
+
+
+def test() -> None:
+    import io
+    import tempfile
+    import time
+    import tracemalloc
+
+    from models.calendar_event import EventCompiler
+    from parser import HTMLToCourseParser
+    from synthetic_schedule import generate_schedule_page
+    from utils import get_sample_course_list
+
+    sample = io.StringIO()
+    stream_ics(EventCompiler().compile_course(get_sample_course_list()[0]), sample)
+    print(sample.getvalue().replace(CRLF, "\n")[:1200])
+
+    print("\n".join(vtimezone_lines("Europe/Berlin", 2026, 2026)))
+
+    courses = HTMLToCourseParser.parse_page(
+        generate_schedule_page(courses=400, batches=3, timing_lines=3, seed=4)
+    )
+    cohort = courses * 3
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "cohort.ics"
+
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        count = write_ics(EventCompiler().iter_course_list(cohort), path)
+        elapsed = time.perf_counter() - started_at
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"Exported {count} event(s), {path.stat().st_size / 1024 / 1024:.1f} MiB "
+            f"in {elapsed:.2f}s, peak python memory {peak / 1024 / 1024:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,114 @@
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Final, List, Tuple
+
+SRC_PATH: Final[Path] = Path(__file__).resolve().parent
+
+# modules each main.py subcommand ends up importing, mirrors the lazy imports in main.py
+COMMAND_IMPORTS: Final[Dict[str, List[str]]] = {
+    "help": ["main"],
+    "scrape": ["main", "snapshot", "http_scraper"],
+    "parse": ["main", "snapshot", "parse_cache", "review_store"],
+    "sync": ["main", "review_store", "synchronizer"],
+    "export": ["main", "review_store", "models.calendar_event", "ics_export"],
+    "clashes": ["main", "review_store", "recurrence"],
+    "watch": ["main", "watcher"],
+}
+
+# milliseconds of import time allowed per subcommand, measured on a warm bytecode cache
+IMPORT_BUDGETS_MS: Final[Dict[str, float]] = {
+    "help": 250,
+    "scrape": 500,
+    "parse": 350,
+    "sync": 700,
+    "export": 300,
+    "clashes": 300,
+    "watch": 300,
+}
+
+
+@dataclass(frozen=True)
+class ImportMeasurement:
+    command: str
+    total_ms: float
+    budget_ms: float
+    slowest: List[Tuple[str, float]]
+
+    @property
+    def within_budget(self) -> bool:
+        return self.total_ms <= self.budget_ms
+
+
+def measure_imports(modules: List[str]) -> Tuple[float, List[Tuple[str, float]]]:
+    env = dict(os.environ, PYTHONPATH=str(SRC_PATH))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    # only top level entries are summed, nested ones are already in their cumulative time
+    top_level: List[Tuple[str, float]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue
+        name = name.strip()
+        # interpreter startup, up to and including site, is paid whatever the command
+        if name == "site":
+            top_level.clear()
+            continue
+        top_level.append((name, int(cumulative) / 1000))
+
+    total_ms = sum(ms for _, ms in top_level)
+    slowest = sorted(top_level, key=lambda item: item[1], reverse=True)[:5]
+    return total_ms, slowest
+
+
+def check_budgets(repeat: int = 3) -> List[ImportMeasurement]:
+    measurements: List[ImportMeasurement] = []
+
+    for command, modules in COMMAND_IMPORTS.items():
+        # best of n, the first run may also be paying for bytecode compilation
+        runs = [measure_imports(modules) for _ in range(repeat)]
+        total_ms, slowest = min(runs, key=lambda run: run[0])
+        measurements.append(
+            ImportMeasurement(
+                command=command,
+                total_ms=total_ms,
+                budget_ms=IMPORT_BUDGETS_MS[command],
+                slowest=slowest,
+            )
+        )
+
+    return measurements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Check the import time of each main.py subcommand against its budget"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    measurements = check_budgets(args.repeat)
+    for m in measurements:
+        status = "OK" if m.within_budget else "OVER BUDGET"
+        print(f"{m.command:<8} {m.total_ms:>7.0f} ms / {m.budget_ms:.0f} ms  {status}")
+        for name, ms in m.slowest:
+            print(f"    {name:<40} {ms:>7.1f} ms")
+
+    if not all(m.within_budget for m in measurements):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,298 @@
+from __future__ import annotations
+
 import argparse
-from typing import List
+import time
+from pathlib import Path
+from typing import Final, Iterable, Iterator, List, Optional, TYPE_CHECKING
 
-from parser import HTMLToCourseParser
-from scraper import SNUERPScraper
-from synchronizer import CalendarSynchronizer
+from config import ERPCredentials, get_app_config
 from models.course import (
+    CompactCourse,
     Course,
     write_courses_to_json,
-    read_courses_from_json,
     REVIEW_FILE_PATH,
 )
+from tracing import span
 from utils import log_action, log_error, log_info, log_success, log_warning
 
+# each subcommand imports its own stack (selenium, googleapiclient, lxml) on first use
+if TYPE_CHECKING:
+    from driver_pool import ChromeDriverPool
+    from review_store import ReviewStore
+
+APP_CONFIG = get_app_config()
+
+SYNC_MODES: Final[List[str]] = ["batch", "concurrent"]
+EXPORT_FORMATS: Final[List[str]] = ["json", "ics"]
+EXPORT_DATA_PATH: Final[Path] = Path("data/export")
+
+
+def scrape_course_divs(
+    credentials: Optional[ERPCredentials] = None,
+    driver_pool: Optional[ChromeDriverPool] = None,
+    fresh: bool = False,
+    snapshots_dir: Optional[Path] = None,
+) -> List[str]:
+    from snapshot import SnapshotStore
+
+    credentials = credentials or ERPCredentials.from_env()
+    snapshots = SnapshotStore(snapshots_dir) if snapshots_dir else SnapshotStore()
+
+    snapshot = None if fresh else snapshots.load_fresh(credentials.netid)
+    if snapshot is not None:
+        age_min = int(snapshot.age.total_seconds() // 60)
+        log_info(f"Reusing ERP scrape from {age_min} minute(s) ago (use --fresh to re-scrape)")
+        from metrics import SCRAPES
+
+        SCRAPES.inc(backend="snapshot", result="ok")
+        return snapshot.course_divs
+
+    from http_scraper import create_scraper
 
-def scrape_and_parse_courses() -> List[Course]:
     log_info("Scraping ERP...")
-    scraper = SNUERPScraper()
-    schedule_html = scraper.get_weekly_schedule_html()
+    with span("scrape", "main"):
+        scraper = create_scraper(driver_pool=driver_pool)
+        schedule_html = scraper.get_weekly_schedule_html(credentials)
+        snapshots.save(credentials.netid, schedule_html)
+
+    return schedule_html
+
+
+def parse_course_divs(schedule_html: List[str]) -> List[Course]:
+    from parse_cache import ParseCache
 
     log_info("Parsing scraped data...")
-    courses = [HTMLToCourseParser.parse_raw_html(raw) for raw in schedule_html]
-    courses = [c for c in courses if c]
+    parse_cache = ParseCache()
+    with span("parse", "main", fragments=len(schedule_html)):
+        courses = parse_cache.parse_all(schedule_html)
+    log_info(f"Parse cache: {parse_cache.summary()}")
 
     return courses
 
 
-def sync_to_calendar(courses: List[Course]) -> None:
-    enrolled_courses = [c for c in courses if c.is_enrolled]
-    log_info(
-        f"Found {len(enrolled_courses)} enrolled course(s) out of {len(courses)} total"
-    )
+def scrape_and_parse_courses(
+    credentials: Optional[ERPCredentials] = None,
+    driver_pool: Optional[ChromeDriverPool] = None,
+    fresh: bool = False,
+) -> List[Course]:
+    schedule_html = scrape_course_divs(credentials, driver_pool, fresh)
+    return parse_course_divs(schedule_html)
+
+
+def sync_to_calendar(courses: Iterable[Course], mode: str = "batch") -> None:
+    from synchronizer import CalendarSynchronizer, SyncMode
+
+    total = 0
+    enrolled_courses: List[Course] = []
+    for course in courses:
+        total += 1
+        if course.is_enrolled:
+            enrolled_courses.append(course)
+    log_info(f"Found {len(enrolled_courses)} enrolled course(s) out of {total} total")
 
     if not enrolled_courses:
         log_warning("No enrolled courses available for synchronization")
         return
 
-    synchronizer = CalendarSynchronizer()
-    synchronizer.synchronize(enrolled_courses)
+    with span("sync", "main", courses=len(enrolled_courses), mode=mode):
+        synchronizer = CalendarSynchronizer()
+        failures = synchronizer.synchronize(enrolled_courses, mode=SyncMode(mode))
+    if failures:
+        log_warning(f"{len(failures)} calendar event(s) failed to sync")
+        return
+
     log_success("Course data successfully synced to Google Calendar")
 
 
-def process_review_file() -> None:
-    log_info("Review file found. Reading courses...")
-    courses = read_courses_from_json(REVIEW_FILE_PATH)
-    sync_to_calendar(courses)
+def _open_review_store() -> ReviewStore:
+    from review_store import ReviewStore
+
+    store = ReviewStore()
+    with span("load_review", "main"):
+        if store.is_stale(REVIEW_FILE_PATH):
+            # the indented export is the editable copy, fold any edits back into the store
+            stats = store.import_json(REVIEW_FILE_PATH)
+            log_info(
+                f"Review file edited: {stats.changed} of {stats.written} course(s) changed"
+            )
+    return store
+
+
+def iter_review_courses() -> Iterator[Course]:
+    # records are validated one at a time, callers keep only the courses they need
+    return _open_review_store().courses()
+
+
+def iter_compact_review_courses() -> Iterator[CompactCourse]:
+    # read-only bulk commands skip validation and hold the slotted mirrors instead
+    return _open_review_store().compact_courses()
 
 
-def create_review_file() -> None:
-    courses = scrape_and_parse_courses()
+def load_review_courses() -> List[Course]:
+    return list(iter_review_courses())
 
+
+def process_review_file(mode: str = "batch") -> None:
+    log_info("Review file found. Reading courses...")
+    sync_to_calendar(iter_review_courses(), mode)
+
+
+def write_review_file(courses: List[Course]) -> None:
     log_info(f"Scraped {len(courses)} course(s) total")
 
     if not courses:
         log_warning("No courses found. Operation aborted.")
         return
 
+    from review_store import ReviewStore
+
+    # the export is written first so the store ends up the newer of the two
     write_courses_to_json(courses, REVIEW_FILE_PATH)
+    stats = ReviewStore().write(courses)
+    log_info(f"Review store updated: {stats.changed} of {stats.written} course(s) changed")
     log_success(f"Course data exported to: {REVIEW_FILE_PATH}")
     log_action("Please review the exported file and re-run the script to complete sync")
 
 
+def create_review_file(fresh: bool = False) -> None:
+    write_review_file(scrape_and_parse_courses(fresh=fresh))
+
+
+def process_roster(
+    roster_path: Path,
+    workers: int,
+    pool: str,
+    mode: str = "batch",
+    fresh: bool = False,
+) -> None:
+    from roster import load_roster, PoolKind, run_roster
+
+    profiles = load_roster(roster_path)
+    log_info(f"Running {len(profiles)} student profile(s) on {workers} {pool} worker(s)...")
+
+    report = run_roster(
+        profiles, workers=workers, pool=PoolKind(pool), sync_mode=mode, fresh=fresh
+    )
+    print(report.pretty_str())
+
+    if report.failed:
+        log_warning(f"{len(report.failed)} student profile(s) did not sync cleanly")
+    else:
+        log_success("All student profiles synced to Google Calendar")
+
+
+def scrape_command(args: argparse.Namespace) -> None:
+    schedule_html = scrape_course_divs(fresh=args.fresh)
+    log_success(f"Saved {len(schedule_html)} course div(s) to the scrape snapshot")
+
+
+def parse_command(args: argparse.Namespace) -> None:
+    if args.input is not None:
+        from parser import HTMLToCourseParser
+
+        log_info(f"Parsing {args.input}...")
+        courses = HTMLToCourseParser.parse_page(args.input.read_text(encoding="utf-8"))
+        write_review_file(courses)
+        return
+
+    from snapshot import SnapshotStore
+
+    credentials = ERPCredentials.from_env()
+    snapshot = SnapshotStore().load_latest(credentials.netid)
+    if snapshot is None:
+        raise FileNotFoundError("No scrape snapshot found. Run the scrape command first")
+
+    write_review_file(parse_course_divs(snapshot.course_divs))
+
+
+def sync_command(args: argparse.Namespace) -> None:
+    if not REVIEW_FILE_PATH.exists():
+        raise FileNotFoundError(
+            f"Review file not found: {REVIEW_FILE_PATH}. Run the parse command first"
+        )
+    process_review_file(args.sync_mode)
+
+
+def export_command(args: argparse.Namespace) -> None:
+    from models.calendar_event import EventCompiler
+
+    enrolled = [c for c in iter_compact_review_courses() if c.is_enrolled]
+    output = args.output or EXPORT_DATA_PATH / f"events.{args.format}"
+
+    with span("export", "main", format=args.format):
+        if args.format == "ics":
+            from ics_export import write_ics
+
+            # events are compiled lazily and streamed straight into the file
+            count = write_ics(EventCompiler().iter_course_list(enrolled), output)
+        else:
+            import json
+
+            events = EventCompiler().compile_course_list(enrolled)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump([event.body for event in events], f, indent=2)
+            count = len(events)
+
+    log_success(f"Exported {count} calendar event(s) to: {output}")
+
+
+def watch_command(args: argparse.Namespace) -> None:
+    import signal
+    from datetime import timedelta
+
+    from watcher import ScheduleWatcher
+
+    watcher = ScheduleWatcher(
+        interval=timedelta(minutes=args.interval_minutes),
+        jitter=timedelta(minutes=args.jitter_minutes),
+        sync_mode=args.sync_mode,
+        metrics_path=args.metrics_file,
+    )
+
+    # service managers stop daemons with SIGTERM, finish the cycle and exit cleanly
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    try:
+        watcher.run(max_cycles=args.cycles)
+    except KeyboardInterrupt:
+        log_info("Watch mode stopped")
+
+
+def clashes_command(args: argparse.Namespace) -> None:
+    from models.calendar_event import EventCompiler
+    from recurrence import count_clashes
+
+    enrolled = [c for c in iter_compact_review_courses() if c.is_enrolled]
+    events = EventCompiler().compile_course_list(enrolled)
+
+    with span("clashes", "main", events=len(events)):
+        clashes = count_clashes(events)
+    if not clashes:
+        log_success(f"No clashes between {len(events)} calendar event(s)")
+        return
+
+    log_warning(f"Found {len(clashes)} clashing pair(s) of classes")
+    for first, second, count in clashes:
+        print(f"  {first} <-> {second}: {count} occurrence(s)")
+
+
+def _add_run_options(
+    parser: argparse.ArgumentParser, suppress_defaults: bool = False
+) -> None:
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        default=argparse.SUPPRESS if suppress_defaults else False,
+        help="Ignore saved ERP scrape snapshots and log in again",
+    )
+    parser.add_argument(
+        "--sync-mode",
+        choices=SYNC_MODES,
+        default=argparse.SUPPRESS if suppress_defaults else "batch",
+        help="Send calendar changes as batch requests or as concurrent rate-limited calls",
+    )
+
+
 def parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Synchronize SNU ERP courses to Google Calendar"
@@ -69,24 +302,181 @@ def parse_arguments() -> argparse.Namespace:
         action="store_true",
         help="Delete the review file and force a fresh scrape from ERP",
     )
+    _add_run_options(parser)
+    parser.add_argument(
+        "--roster",
+        type=Path,
+        help="TOML roster of student profiles to scrape, parse and sync in one run",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of student profiles processed in parallel in roster mode",
+    )
+    parser.add_argument(
+        "--pool",
+        choices=["process", "thread"],
+        default="process",
+        help="Worker pool used in roster mode",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="PATH",
+        help="Write a Chrome trace of the run to PATH and print a per-phase summary",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        default=APP_CONFIG.METRICS_TEXTFILE,
+        metavar="PATH",
+        help="Prometheus textfile written at the end of the run (metrics_textfile in config)",
+    )
+
+    # the same options after a subcommand, suppressed so they never mask the top-level ones
+    run_options = argparse.ArgumentParser(add_help=False)
+    _add_run_options(run_options, suppress_defaults=True)
+
+    # without a subcommand the original review-file workflow runs
+    subparsers = parser.add_subparsers(dest="command")
+
+    scrape_parser = subparsers.add_parser(
+        "scrape",
+        parents=[run_options],
+        help="Fetch the weekly schedule from ERP into a snapshot",
+    )
+    scrape_parser.set_defaults(handler=scrape_command)
+
+    parse_parser = subparsers.add_parser(
+        "parse",
+        parents=[run_options],
+        help="Parse the latest snapshot or a saved page into the review file",
+    )
+    parse_parser.add_argument(
+        "--input",
+        type=Path,
+        help="Saved weekly schedule HTML page to parse instead of the latest snapshot",
+    )
+    parse_parser.set_defaults(handler=parse_command)
+
+    sync_parser = subparsers.add_parser(
+        "sync",
+        parents=[run_options],
+        help="Sync the review file to Google Calendar",
+    )
+    sync_parser.set_defaults(handler=sync_command)
+
+    export_parser = subparsers.add_parser(
+        "export", help="Write the review file's calendar events to disk without syncing"
+    )
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="json")
+    export_parser.add_argument("--output", type=Path, help="Output file path")
+    export_parser.set_defaults(handler=export_command)
+
+    clashes_parser = subparsers.add_parser(
+        "clashes", help="Expand the review file's timetable locally and report clashes"
+    )
+    clashes_parser.set_defaults(handler=clashes_command)
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        parents=[run_options],
+        help="Keep re-scraping ERP and sync only what changed, until stopped",
+    )
+    watch_parser.add_argument(
+        "--interval-minutes",
+        type=float,
+        default=APP_CONFIG.WATCH_INTERVAL_MINUTES,
+        help="Minutes between scrapes (watch_interval_minutes in config)",
+    )
+    watch_parser.add_argument(
+        "--jitter-minutes",
+        type=float,
+        default=APP_CONFIG.WATCH_JITTER_MINUTES,
+        help="Random extra delay of up to this many minutes per cycle",
+    )
+    watch_parser.add_argument(
+        "--cycles", type=int, help="Stop after this many cycles instead of running forever"
+    )
+    watch_parser.set_defaults(handler=watch_command)
+
     return parser.parse_args()
 
 
 def main():
     args = parse_arguments()
 
-    try:
-        if args.reset and REVIEW_FILE_PATH.exists():
-            REVIEW_FILE_PATH.unlink()
-            log_info("Reset: Review file deleted")
+    if args.profile is not None:
+        from tracing import start_tracing
 
-        if REVIEW_FILE_PATH.exists():
-            process_review_file()
-        else:
-            create_review_file()
+        start_tracing()
+
+    command = args.command or ("roster" if args.roster is not None else "review")
+    started_at = time.perf_counter()
+    ok = False
+
+    try:
+        with span("run", "main", command=command):
+            run(args)
+        ok = True
     except Exception as e:
         log_error(f"An error occurred: {str(e)}")
         raise
+    finally:
+        if args.profile is not None:
+            write_profile(args.profile)
+        if args.metrics_file is not None:
+            write_metrics(args.metrics_file, command, ok, time.perf_counter() - started_at)
+
+
+def write_metrics(path: Path, command: str, ok: bool, elapsed_sec: float) -> None:
+    from metrics import REGISTRY, RUN_SECONDS, RUN_SUCCESS, RUN_TIMESTAMP
+
+    RUN_SECONDS.set(elapsed_sec, command=command)
+    RUN_SUCCESS.set(1 if ok else 0, command=command)
+    RUN_TIMESTAMP.set(time.time(), command=command)
+
+    try:
+        REGISTRY.write_textfile(path)
+    except OSError as e:
+        # monitoring must never be the reason a sync run fails
+        log_warning(f"Could not write metrics to {path}: {str(e)}")
+
+
+def write_profile(path: Path) -> None:
+    from tracing import stop_tracing
+
+    tracer = stop_tracing()
+    if tracer is None:
+        return
+
+    tracer.write_chrome_trace(path)
+    print(tracer.summary())
+    log_info(f"Trace written to: {path} (open in chrome://tracing or ui.perfetto.dev)")
+
+
+def run(args: argparse.Namespace) -> None:
+    if args.command is not None:
+        args.handler(args)
+        return
+
+    if args.roster is not None:
+        process_roster(args.roster, args.workers, args.pool, args.sync_mode, args.fresh)
+        return
+
+    if args.reset and REVIEW_FILE_PATH.exists():
+        from review_store import REVIEW_STORE_PATH
+
+        REVIEW_FILE_PATH.unlink()
+        REVIEW_STORE_PATH.unlink(missing_ok=True)
+        log_info("Reset: Review file deleted")
+
+    if REVIEW_FILE_PATH.exists():
+        process_review_file(args.sync_mode)
+    else:
+        # a reset means a real login, never a snapshot from earlier
+        create_review_file(args.fresh or args.reset)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Final, Iterator, List, Optional, Tuple, Union
+
+METRIC_PREFIX: Final[str] = "unisync_"
+
+# seconds, wide enough for a single api call up to a slow erp login
+DEFAULT_BUCKETS: Final[Tuple[float, ...]] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+LabelValues = Tuple[str, ...]
+# picklable copy of every sample, so process pool workers can hand theirs to the parent
+RegistrySnapshot = Dict[str, Dict[LabelValues, Union[float, Tuple[List[int], float]]]]
+
+
+class _Metric:
+    kind: str = ""
+    _values: Dict[LabelValues, Any]
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} takes labels {list(self.labelnames)}. "
+                f"Recieved {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_str(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape_label(value)}"'
+            for name, value in zip(self.labelnames, values)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...]) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError(f"Counter {self.name} can only increase. Recieved {amount}")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._label_str(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...],
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: non-cumulative count per bucket plus one for +Inf, and the sum
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def count(self, **labels: object) -> int:
+        counts, _ = self._values.get(self._key(labels), ([], 0.0))
+        return sum(counts)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+
+        lines: List[str] = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = self._label_str(key, extra=f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_str(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_str(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()
+    ) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames)
+
+    def _register(self, cls, name: str, help_text: str, labelnames: Tuple[str, ...]):
+        full_name = METRIC_PREFIX + name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, help_text, labelnames)
+            elif type(metric) is not cls or metric.labelnames != labelnames:
+                raise ValueError(f"Metric {full_name} is already registered differently")
+            return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            samples = metric.render()
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        # node_exporter may read the directory at any moment, so swap the file in whole
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+    def snapshot(self, reset: bool = False) -> RegistrySnapshot:
+        snapshot: RegistrySnapshot = {}
+        for name, metric in self._metrics.items():
+            with metric._lock:
+                values = metric._values
+                if isinstance(metric, Histogram):
+                    snapshot[name] = {k: (list(c), s) for k, (c, s) in values.items()}
+                else:
+                    snapshot[name] = dict(values)
+                if reset:
+                    values.clear()
+        return snapshot
+
+    def merge(self, snapshot: RegistrySnapshot) -> None:
+        for name, samples in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is None or isinstance(metric, Gauge):
+                continue
+            with metric._lock:
+                values = metric._values
+                for key, sample in samples.items():
+                    if isinstance(metric, Histogram):
+                        counts, total = values.get(key) or (
+                            [0] * (len(metric.buckets) + 1),
+                            0.0,
+                        )
+                        other_counts, other_total = sample  # type: ignore[misc]
+                        values[key] = (
+                            [a + b for a, b in zip(counts, other_counts)],
+                            total + other_total,
+                        )
+                    else:
+                        values[key] = values.get(key, 0.0) + sample
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def http_status_label(error: Optional[BaseException]) -> str:
+    # google's HttpError and requests' HTTPError both carry the status on a response
+    if error is None:
+        return "200"
+    response = getattr(error, "resp", None) or getattr(error, "response", None)
+    status = getattr(response, "status", None) or getattr(response, "status_code", None)
+    return str(status) if status else "transport_error"
+
+
+REGISTRY: Final[MetricsRegistry] = MetricsRegistry()
+
+SCRAPES = REGISTRY.counter(
+    "scrapes_total", "ERP schedule scrapes by backend and outcome", ("backend", "result")
+)
+SCRAPE_SECONDS = REGISTRY.histogram(
+    "scrape_duration_seconds", "Wall time of one ERP schedule scrape", ("backend",)
+)
+LOGIN_FAILURES = REGISTRY.counter(
+    "login_failures_total", "ERP sign-ins rejected or timed out", ("backend",)
+)
+PARSE_RESULTS = REGISTRY.counter(
+    "parse_results_total",
+    "Course divs parsed, result is miss when the parser returned None",
+    ("parser", "result"),
+)
+PARSE_CACHE_LOOKUPS = REGISTRY.counter(
+    "parse_cache_lookups_total",
+    "Course divs looked up in the parse cache, by hit or miss",
+    ("result",),
+)
+PARSE_CACHE_EVICTIONS = REGISTRY.counter(
+    "parse_cache_evictions_total", "Parse cache entries evicted to stay within its limits"
+)
+EVENTS_GENERATED = REGISTRY.counter(
+    "events_generated_total", "Calendar events built from courses"
+)
+SYNC_OPERATIONS = REGISTRY.counter(
+    "sync_operations_planned_total", "Calendar changes planned by the sync", ("kind",)
+)
+API_CALLS = REGISTRY.counter(
+    "api_calls_total",
+    "Calendar API calls by operation and HTTP status",
+    ("operation", "status"),
+)
+API_CALL_SECONDS = REGISTRY.histogram(
+    "api_call_duration_seconds",
+    "Latency of one calendar API call, or of one whole batch request",
+    ("operation",),
+)
+API_RETRIES = REGISTRY.counter(
+    "api_retries_total", "Calendar API calls retried after an error", ("status",)
+)
+SCHEDULE_CHECKS = REGISTRY.counter(
+    "schedule_checks_total",
+    "Scraped timetables compared against the stored fingerprint, by outcome",
+    ("result",),
+)
+WATCH_CYCLES = REGISTRY.counter(
+    "watch_cycles_total", "Watch mode cycles by outcome", ("result",)
+)
+LAST_SCHEDULE_CHANGE = REGISTRY.gauge(
+    "last_schedule_change_timestamp_seconds", "Unix time watch mode last saw a new timetable"
+)
+RUN_SECONDS = REGISTRY.gauge(
+    "last_run_duration_seconds", "Wall time of the last run", ("command",)
+)
+RUN_SUCCESS = REGISTRY.gauge(
+    "last_run_success", "1 if the last run finished without raising", ("command",)
+)
+RUN_TIMESTAMP = REGISTRY.gauge(
+    "last_run_timestamp_seconds", "Unix time the last run finished", ("command",)
+)
+
+
+def test() -> None:
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    registry = MetricsRegistry()
+    calls = registry.counter("demo_calls_total", "Demo calls", ("operation", "status"))
+    latency = registry.histogram("demo_call_duration_seconds", "Demo latency", ("operation",))
+
+    def work(i: int) -> None:
+        with latency.time(operation="insert"):
+            time.sleep(0.001 * (i % 5))
+        calls.inc(operation="insert", status="200" if i % 10 else "429")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(work, range(200)))
+
+    print(f"Thread-safe counts: {calls.value(operation='insert', status='200')} ok, "
+          f"{calls.value(operation='insert', status='429')} throttled, "
+          f"{latency.count(operation='insert')} observed")
+
+    worker = MetricsRegistry()
+    worker.counter("demo_calls_total", "Demo calls", ("operation", "status")).inc(
+        5, operation="delete", status="404"
+    )
+    registry.merge(worker.snapshot(reset=True))
+    print(f"Merged worker sample: {calls.value(operation='delete', status='404')}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "unisync.prom"
+        registry.write_textfile(path)
+        text = path.read_text(encoding="utf-8")
+    print("\n".join(line for line in text.splitlines() if "_bucket" not in line))
+
+
+if __name__ == "__main__":
+    test()
@@ -1,35 +1,55 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import date, datetime, time, timedelta
-from pydantic import BaseModel
-from typing import Dict, List
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Final, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
 from zoneinfo import ZoneInfo
 
-from models.course import Course, CourseBatch, Day, Timing
-from config import AppConfig
+from models.course import CompactBatch, CompactCourse, CompactTiming, Course, CourseBatch, Day, Timing
+from config import get_app_config
+from exclusions import ExclusionIndex
+from metrics import EVENTS_GENERATED
 
-APP_CONFIG = AppConfig.from_toml()
+APP_CONFIG = get_app_config()
+
+# the compiler takes the pydantic models or their compact mirrors alike
+AnyCourse = Union[Course, CompactCourse]
+AnyBatch = Union[CourseBatch, CompactBatch]
+AnyTiming = Union[Timing, CompactTiming]
+
+# shared by CalendarEvent and EventCompiler so both builders emit the same body
+DEFAULT_TIMEZONE: Final[str] = APP_CONFIG.TIMEZONE
+# compiled bodies all reference this one dict, it is never mutated
+EVENT_REMINDERS: Final[Dict[str, Any]] = {
+    "useDefault": False,
+    "overrides": [
+        {"method": "popup", "minutes": 15},
+        {"method": "popup", "minutes": 30},
+    ],
+}
 
 
 class CalendarTime(BaseModel):
     dateTime: str
-    timeZone: str = APP_CONFIG.TIMEZONE
+    timeZone: str = DEFAULT_TIMEZONE
+
+    @staticmethod
+    def body(dt: datetime, timezone: str = DEFAULT_TIMEZONE) -> Dict[str, str]:
+        # what model_dump gives for CalendarTime(dateTime=dt.isoformat()), without pydantic
+        return {"dateTime": dt.isoformat(), "timeZone": timezone}
 
 
 class CalendarEvent(BaseModel):
+    # stable identity of the (course, batch, timing) this event was built from
+    key: str = Field(default="", exclude=True)
     summary: str
     description: str
     location: str
     start: CalendarTime
     end: CalendarTime
     colorId: str
-    reminders: Dict = {
-        "useDefault": False,
-        "overrides": [
-            {"method": "popup", "minutes": 15},
-            {"method": "popup", "minutes": 30},
-        ],
-    }
+    reminders: Dict = EVENT_REMINDERS
     recurrence: List[str]
 
     @staticmethod
@@ -42,41 +62,203 @@ class CalendarEvent(BaseModel):
 
     @staticmethod
     def from_course(course: Course) -> List[CalendarEvent]:
-        events: List[CalendarEvent] = []
-
-        for batch in course.batches:
-            if isinstance(batch.component, tuple):
-                component_type, batch_num = batch.component
-                component_str = f"{component_type.value}{batch_num}"
-            else:
-                component_str = batch.component
-
-            # use course_shorthand if available, otherwise generate it
-            shorthand = course.course_shorthand
-            if shorthand is None:
-                shorthand = f"{course.course_code.upper()} {course.course_title}"
-
-            summary = f"{shorthand} - {component_str}"
-
-            for timing in batch.timings:
-                event = _create_event_from_timing(
-                    summary=summary,
-                    description=course.course_title,
-                    batch=batch,
-                    timing=timing,
-                )
-                events.append(event)
+        events = [
+            _create_event_from_timing(
+                key=key,
+                summary=summary,
+                description=course.course_title,
+                batch=batch,
+                timing=timing,
+            )
+            for key, summary, batch, timing in _iter_course_timings(course)
+        ]
+        EVENTS_GENERATED.inc(len(events))
+        return events
 
+
+@dataclass(frozen=True, slots=True)
+class CompiledEvent:
+    key: str
+    # identical to CalendarEvent.model_dump(mode="json") for the same timing
+    body: Dict[str, Any]
+
+
+class EventCompiler:
+    # fast path for courses that were already validated, skips pydantic entirely
+    def __init__(
+        self,
+        timezone: str = DEFAULT_TIMEZONE,
+        excluded_dates: Optional[ExclusionIndex] = None,
+    ) -> None:
+        self.timezone = timezone
+        self._tz = ZoneInfo(timezone)
+        self._excluded = (
+            APP_CONFIG.EXCLUDED_DATES if excluded_dates is None else excluded_dates
+        )
+
+        self._dates: Dict[str, date] = {}
+        self._times: Dict[str, time] = {}
+        self._until: Dict[Union[str, date], str] = {}
+        self._byday: Dict[Tuple[int, ...], str] = {}
+        self._exdates: Dict[Tuple[Union[str, date], Union[str, date], FrozenSet[int]], List[str]] = {}
+
+    def compile_course_list(self, course_list: List[AnyCourse]) -> List[CompiledEvent]:
+        return [
+            event for course in course_list for event in self.compile_course(course)
+        ]
+
+    def iter_course_list(self, course_list: Iterable[AnyCourse]) -> Iterator[CompiledEvent]:
+        # lazy twin of compile_course_list for sinks that stream events out
+        for course in course_list:
+            yield from self.compile_course(course)
+
+    def compile_course(self, course: AnyCourse) -> List[CompiledEvent]:
+        events = [
+            CompiledEvent(
+                key=key,
+                body=self._compile_timing(summary, course.course_title, batch, timing),
+            )
+            for key, summary, batch, timing in _iter_course_timings(course)
+        ]
+        EVENTS_GENERATED.inc(len(events))
         return events
 
+    def _compile_timing(
+        self, summary: str, description: str, batch: AnyBatch, timing: AnyTiming
+    ) -> Dict[str, Any]:
+        start_date = self._date(batch.start_date)
+        weekdays = frozenset(timing.weekdays)
+
+        first_occurrence = start_date
+        if weekdays:
+            for offset in range(7):
+                if (start_date.weekday() + offset) % 7 in weekdays:
+                    first_occurrence = start_date + timedelta(days=offset)
+                    break
+
+        start_time = self._time(timing.start_time)
+        start_dt = datetime.combine(first_occurrence, start_time, tzinfo=self._tz)
+        end_dt = datetime.combine(
+            first_occurrence, self._time(timing.end_time), tzinfo=self._tz
+        )
+
+        recurrence: List[str] = []
+        if timing.weekdays:
+            recurrence.append(
+                f"RRULE:FREQ=WEEKLY;BYDAY={self._byday_str(timing.weekdays)};"
+                f"UNTIL={self._until_str(batch.end_date)}"
+            )
+
+        excluded_days = self._excluded_days(batch.start_date, batch.end_date, weekdays)
+        if excluded_days:
+            start_str = start_time.strftime("T%H%M%S")
+            recurrence.append(
+                f"EXDATE;TZID={self.timezone}:"
+                + ",".join(day + start_str for day in excluded_days)
+            )
+
+        return {
+            "summary": summary,
+            "description": description,
+            "location": timing.venue,
+            "start": CalendarTime.body(start_dt, self.timezone),
+            "end": CalendarTime.body(end_dt, self.timezone),
+            "colorId": str(batch.event_color),
+            "reminders": EVENT_REMINDERS,
+            "recurrence": recurrence,
+        }
+
+    # compact models already hold date and time objects
+    def _date(self, value: Union[str, date]) -> date:
+        if isinstance(value, date):
+            return value
+        parsed = self._dates.get(value)
+        if parsed is None:
+            parsed = self._dates[value] = date.fromisoformat(value)
+        return parsed
+
+    def _time(self, value: Union[str, time]) -> time:
+        if isinstance(value, time):
+            return value
+        parsed = self._times.get(value)
+        if parsed is None:
+            hour, minute = map(int, value.split(":"))
+            parsed = self._times[value] = time(hour, minute)
+        return parsed
+
+    def _byday_str(self, weekdays: Tuple[int, ...]) -> str:
+        byday = self._byday.get(weekdays)
+        if byday is None:
+            byday = self._byday[weekdays] = ",".join(
+                Day.from_weekday(weekday).rrule for weekday in weekdays
+            )
+        return byday
+
+    def _until_str(self, end_date: Union[str, date]) -> str:
+        until = self._until.get(end_date)
+        if until is None:
+            until_utc = datetime.combine(
+                self._date(end_date), time(23, 59, 59), tzinfo=self._tz
+            ).astimezone(_UTC)
+            until = self._until[end_date] = until_utc.strftime("%Y%m%dT%H%M%SZ")
+        return until
+
+    def _excluded_days(
+        self, start_date: Union[str, date], end_date: Union[str, date], weekdays: FrozenSet[int]
+    ) -> List[str]:
+        cache_key = (start_date, end_date, weekdays)
+        days = self._exdates.get(cache_key)
+        if days is None:
+            days = self._exdates[cache_key] = [
+                d.strftime("%Y%m%d")
+                for d in self._excluded.dates_between(
+                    self._date(start_date), self._date(end_date), weekdays
+                )
+            ]
+        return days
+
+
+_UTC = ZoneInfo("UTC")
+
+
+def _iter_course_timings(
+    course: AnyCourse,
+) -> Iterator[Tuple[str, str, AnyBatch, AnyTiming]]:
+    component_counts: Dict[str, int] = {}
+
+    for batch in course.batches:
+        if isinstance(batch.component, tuple):
+            component_type, batch_num = batch.component
+            component_str = f"{component_type.value}{batch_num}"
+        else:
+            component_str = batch.component
+
+        # keep keys unique when a course lists the same component twice
+        occurrence = component_counts.get(component_str, 0)
+        component_counts[component_str] = occurrence + 1
+        batch_key = f"{course.course_code}|{component_str}"
+        if occurrence:
+            batch_key = f"{batch_key}#{occurrence}"
+
+        # use course_shorthand if available, otherwise generate it
+        shorthand = course.course_shorthand
+        if shorthand is None:
+            shorthand = f"{course.course_code.upper()} {course.course_title}"
+
+        summary = f"{shorthand} - {component_str}"
+
+        for timing_index, timing in enumerate(batch.timings):
+            yield f"{batch_key}|{timing_index}", summary, batch, timing
+
 
 def _create_event_from_timing(
+    key: str,
     summary: str,
     description: str,
     batch: CourseBatch,
     timing: Timing,
 ) -> CalendarEvent:
-    tz = ZoneInfo(APP_CONFIG.TIMEZONE)
+    tz = ZoneInfo(DEFAULT_TIMEZONE)
 
     first_occurrence = _find_first_occurrence(batch.start_date_obj, timing.days)
 
@@ -86,6 +268,7 @@ def _create_event_from_timing(
     recurrence = _build_recurrence(batch, timing)
 
     return CalendarEvent(
+        key=key,
         summary=summary,
         description=description,
         location=timing.venue,
@@ -102,8 +285,7 @@ def _find_first_occurrence(start_date: date, days: List[Day]) -> date:
 
     current = start_date
     for _ in range(7):
-        weekday = current.weekday()
-        if Day.from_weekday(weekday) in days:
+        if Day.from_weekday(current.weekday()) in days:
             return current
         current += timedelta(days=1)
 
@@ -119,7 +301,7 @@ def _build_recurrence(batch: CourseBatch, timing: Timing) -> List[str]:
         until_utc = datetime.combine(
             batch.end_date_obj,
             time(23, 59, 59),
-            tzinfo=ZoneInfo(APP_CONFIG.TIMEZONE),
+            tzinfo=ZoneInfo(DEFAULT_TIMEZONE),
         ).astimezone(ZoneInfo("UTC"))
         until_str = until_utc.strftime("%Y%m%dT%H%M%SZ")
 
@@ -134,28 +316,23 @@ def _build_recurrence(batch: CourseBatch, timing: Timing) -> List[str]:
 
 
 def _build_exdates(batch: CourseBatch, timing: Timing) -> str:
-    excluded_datetimes: List[str] = []
-
-    for excluded_date in APP_CONFIG.EXCLUDED_DATES:
-        # check if excluded date is within the batch date range
-        if not (batch.start_date_obj <= excluded_date <= batch.end_date_obj):
-            continue
-
-        # check if excluded date's weekday matches any timing day
-        weekday = excluded_date.weekday()
-        if Day.from_weekday(weekday) not in timing.days:
-            continue
+    weekdays = set(timing.weekdays)
+    if not weekdays:
+        return ""
 
+    # only excluded dates inside the batch's range on one of its weekdays come back
+    excluded_datetimes = [
         # format as YYYYMMDDTHHMMSS (local time with TZID)
-        excluded_dt_str = datetime.combine(excluded_date, timing.start_time_obj).strftime(
-            "%Y%m%dT%H%M%S"
+        datetime.combine(excluded_date, timing.start_time_obj).strftime("%Y%m%dT%H%M%S")
+        for excluded_date in APP_CONFIG.EXCLUDED_DATES.dates_between(
+            batch.start_date_obj, batch.end_date_obj, weekdays
         )
-        excluded_datetimes.append(excluded_dt_str)
+    ]
 
     if not excluded_datetimes:
         return ""
 
-    return f"EXDATE;TZID={APP_CONFIG.TIMEZONE}:{','.join(excluded_datetimes)}"
+    return f"EXDATE;TZID={DEFAULT_TIMEZONE}:{','.join(excluded_datetimes)}"
 
 
 def test() -> None:
@@ -180,6 +357,14 @@ def test() -> None:
             print(f"  {rule}")
         print()
 
+    compiled = EventCompiler().compile_course(sample_course)
+    strict = [(e.key, e.model_dump(mode="json")) for e in events]
+    print(f"Compiled path matches strict path: {strict == [(e.key, e.body) for e in compiled]}")
+
+    compact = CompactCourse.from_dict(sample_course.model_dump(mode="json"))
+    compact_compiled = EventCompiler().compile_course(compact)
+    print(f"Compact path matches strict path: {strict == [(e.key, e.body) for e in compact_compiled]}")
+
 
 if __name__ == "__main__":
     test()
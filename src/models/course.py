@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import json
 import re
+from dataclasses import dataclass
 from datetime import date, time
 from enum import StrEnum
+from functools import cached_property
 from pathlib import Path
 from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import Final, List, Optional, Tuple, Union
+from typing import Any, ClassVar, Dict, Final, List, Optional, Tuple, Union
 
 REVIEW_FILE_PATH: Final[Path] = Path("data/review/review-courses.json")
 
@@ -14,6 +16,30 @@ TIME_RE = re.compile(r"^(?:[01]?\d|2[0-3]):[0-5]\d$")
 VENUE_RE = re.compile(r"[A-Za-z]\d{3}[A-Za-z]?")
 
 
+class _MemoizedModel(BaseModel):
+    # names of cached_property values derived from the fields, dropped on reassignment
+    _derived: ClassVar[Tuple[str, ...]] = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        self._drop_derived()
+
+    # model_copy copies __dict__ and then writes its update straight into it
+    def __copy__(self) -> Any:
+        copied = super().__copy__()
+        copied._drop_derived()
+        return copied
+
+    def __deepcopy__(self, memo: Optional[Dict[int, Any]] = None) -> Any:
+        copied = super().__deepcopy__(memo)
+        copied._drop_derived()
+        return copied
+
+    def _drop_derived(self) -> None:
+        for derived in self._derived:
+            self.__dict__.pop(derived, None)
+
+
 class Course(BaseModel):
     course_code: str
     course_title: str
@@ -47,7 +73,9 @@ class Course(BaseModel):
         return "\n".join(lines)
 
 
-class CourseBatch(BaseModel):
+class CourseBatch(_MemoizedModel):
+    _derived: ClassVar[Tuple[str, ...]] = ("start_date_obj", "end_date_obj")
+
     event_color: int = Field(ge=1, le=11, default=1)
     component: Union[Tuple[ComponentType, int], str]
     timings: List[Timing] = Field(default_factory=list)
@@ -67,11 +95,11 @@ class CourseBatch(BaseModel):
             f"Invalid type for date: {type(value)}. Expected date or string"
         )
 
-    @property
+    @cached_property
     def start_date_obj(self) -> date:
         return date.fromisoformat(self.start_date)
 
-    @property
+    @cached_property
     def end_date_obj(self) -> date:
         return date.fromisoformat(self.end_date)
 
@@ -98,7 +126,9 @@ class CourseBatch(BaseModel):
         return "\n".join(lines)
 
 
-class Timing(BaseModel):
+class Timing(_MemoizedModel):
+    _derived: ClassVar[Tuple[str, ...]] = ("start_time_obj", "end_time_obj")
+
     start_time: str
     end_time: str
     days: List[Day] = Field(default_factory=list)
@@ -120,16 +150,21 @@ class Timing(BaseModel):
             f"Invalid type for time: {type(value)}. Expected time or string"
         )
 
-    @property
+    @cached_property
     def start_time_obj(self) -> time:
         hour, minute = map(int, self.start_time.split(":"))
         return time(hour, minute)
 
-    @property
+    @cached_property
     def end_time_obj(self) -> time:
         hour, minute = map(int, self.end_time.split(":"))
         return time(hour, minute)
 
+    # not cached, days is a list that can be edited in place
+    @property
+    def weekdays(self) -> Tuple[int, ...]:
+        return tuple(day.weekday for day in self.days)
+
     @field_validator("venue", mode="before")
     def _convert_venue(cls, value: str) -> str:
         if not isinstance(value, str):
@@ -172,41 +207,148 @@ class Day(StrEnum):
 
     @property
     def rrule(self) -> str:
-        match self:
-            case Day.MONDAY:
-                return "MO"
-            case Day.TUESDAY:
-                return "TU"
-            case Day.WEDNESDAY:
-                return "WE"
-            case Day.THURSDAY:
-                return "TH"
-            case Day.FRIDAY:
-                return "FR"
-            case Day.SATURDAY:
-                return "SA"
-            case Day.SUNDAY:
-                return "SU"
+        return _RRULE_BY_DAY[self]
+
+    @property
+    def weekday(self) -> int:
+        return _WEEKDAY_BY_DAY[self]
 
     @classmethod
     def from_weekday(cls, weekday: int) -> Day:
-        match weekday:
-            case 0:
-                return cls.MONDAY
-            case 1:
-                return cls.TUESDAY
-            case 2:
-                return cls.WEDNESDAY
-            case 3:
-                return cls.THURSDAY
-            case 4:
-                return cls.FRIDAY
-            case 5:
-                return cls.SATURDAY
-            case 6:
-                return cls.SUNDAY
-            case _:
-                raise ValueError(f"Invalid weekday: {weekday}")
+        if not 0 <= weekday < len(_DAYS_BY_WEEKDAY):
+            raise ValueError(f"Invalid weekday: {weekday}")
+        return _DAYS_BY_WEEKDAY[weekday]
+
+
+# declaration order of Day is monday first, matching date.weekday()
+_DAYS_BY_WEEKDAY: Final[Tuple[Day, ...]] = tuple(Day)
+_WEEKDAY_BY_DAY: Final[Dict[Day, int]] = {day: i for i, day in enumerate(_DAYS_BY_WEEKDAY)}
+_RRULE_BY_DAY: Final[Dict[Day, str]] = {
+    Day.MONDAY: "MO",
+    Day.TUESDAY: "TU",
+    Day.WEDNESDAY: "WE",
+    Day.THURSDAY: "TH",
+    Day.FRIDAY: "FR",
+    Day.SATURDAY: "SA",
+    Day.SUNDAY: "SU",
+}
+
+
+# plain slotted mirrors of the models, for holding whole rosters in memory at once
+@dataclass(frozen=True, slots=True)
+class CompactTiming:
+    start_time: time
+    end_time: time
+    weekdays: Tuple[int, ...]
+    venue: str
+
+    @classmethod
+    def from_timing(cls, timing: Timing) -> CompactTiming:
+        return cls(
+            start_time=timing.start_time_obj,
+            end_time=timing.end_time_obj,
+            weekdays=timing.weekdays,
+            venue=timing.venue,
+        )
+
+    # trusts data that was already validated once, e.g. a Timing.model_dump
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> CompactTiming:
+        return cls(
+            start_time=time.fromisoformat(data["start_time"]),
+            end_time=time.fromisoformat(data["end_time"]),
+            weekdays=tuple(_WEEKDAY_BY_DAY[day] for day in data["days"]),
+            venue=data["venue"],
+        )
+
+    def to_timing(self) -> Timing:
+        return Timing(
+            start_time=self.start_time,
+            end_time=self.end_time,
+            days=[_DAYS_BY_WEEKDAY[weekday] for weekday in self.weekdays],
+            venue=self.venue,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CompactBatch:
+    event_color: int
+    component: Union[Tuple[ComponentType, int], str]
+    start_date: date
+    end_date: date
+    timings: Tuple[CompactTiming, ...]
+
+    @classmethod
+    def from_batch(cls, batch: CourseBatch) -> CompactBatch:
+        return cls(
+            event_color=batch.event_color,
+            component=batch.component,
+            start_date=batch.start_date_obj,
+            end_date=batch.end_date_obj,
+            timings=tuple(CompactTiming.from_timing(t) for t in batch.timings),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> CompactBatch:
+        component = data["component"]
+        if not isinstance(component, str):
+            component_type, batch_num = component
+            component = (ComponentType(component_type), batch_num)
+
+        return cls(
+            event_color=data["event_color"],
+            component=component,
+            start_date=date.fromisoformat(data["start_date"]),
+            end_date=date.fromisoformat(data["end_date"]),
+            timings=tuple(CompactTiming.from_dict(t) for t in data["timings"]),
+        )
+
+    def to_batch(self) -> CourseBatch:
+        return CourseBatch(
+            event_color=self.event_color,
+            component=self.component,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            timings=[t.to_timing() for t in self.timings],
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CompactCourse:
+    course_code: str
+    course_title: str
+    course_shorthand: Optional[str]
+    is_enrolled: bool
+    batches: Tuple[CompactBatch, ...]
+
+    @classmethod
+    def from_course(cls, course: Course) -> CompactCourse:
+        return cls(
+            course_code=course.course_code,
+            course_title=course.course_title,
+            course_shorthand=course.course_shorthand,
+            is_enrolled=course.is_enrolled,
+            batches=tuple(CompactBatch.from_batch(b) for b in course.batches),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> CompactCourse:
+        return cls(
+            course_code=data["course_code"],
+            course_title=data["course_title"],
+            course_shorthand=data["course_shorthand"],
+            is_enrolled=data["is_enrolled"],
+            batches=tuple(CompactBatch.from_dict(b) for b in data["batches"]),
+        )
+
+    def to_course(self) -> Course:
+        return Course(
+            course_code=self.course_code,
+            course_title=self.course_title,
+            course_shorthand=self.course_shorthand,
+            is_enrolled=self.is_enrolled,
+            batches=[b.to_batch() for b in self.batches],
+        )
 
 
 def _convert_title_to_shorthand(title: str) -> str:
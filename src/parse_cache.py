@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Final, Iterable, List, Optional, Tuple
+
+from config import get_app_config
+from metrics import PARSE_CACHE_EVICTIONS, PARSE_CACHE_LOOKUPS
+from models.course import Course
+from parser import PARSER_VERSION, HTMLToCourseParser
+
+APP_CONFIG = get_app_config()
+
+PARSE_CACHE_PATH: Final[Path] = Path("data/cache/parsed")
+DEFAULT_MAX_ENTRIES: Final[int] = 4096
+DEFAULT_MAX_BYTES: Final[int] = 32 * 1024 * 1024
+
+
+@dataclass
+class _Entry:
+    size: int
+    last_used: float
+
+
+class ParseCache:
+    def __init__(
+        self,
+        cache_dir: Path = PARSE_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        parse_func: Callable[[str], Optional[Course]] = HTMLToCourseParser.parse_fragment,
+    ) -> None:
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError(
+                f"Cache bounds must be positive. Recieved {max_entries} entries, {max_bytes} bytes"
+            )
+
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.parse_func = parse_func
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # anything that changes what a fragment parses to has to be part of the key
+        self._salt = "\0".join(
+            [
+                PARSER_VERSION,
+                APP_CONFIG.DEFAULT_START_DATE.isoformat(),
+                APP_CONFIG.DEFAULT_END_DATE.isoformat(),
+            ]
+        ).encode("utf-8")
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._total_bytes = 0
+        self._load_index()
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def key_for(self, raw_html: str) -> str:
+        digest = hashlib.sha256(self._salt)
+        digest.update(b"\0")
+        digest.update(raw_html.encode("utf-8"))
+        return digest.hexdigest()
+
+    def parse(self, raw_html: str) -> Optional[Course]:
+        key = self.key_for(raw_html)
+
+        found, course = self._get(key)
+        if found:
+            with self._lock:
+                self.hits += 1
+            PARSE_CACHE_LOOKUPS.inc(result="hit")
+            return course
+
+        with self._lock:
+            self.misses += 1
+        PARSE_CACHE_LOOKUPS.inc(result="miss")
+
+        course = self.parse_func(raw_html)
+        self._put(key, course)
+        return course
+
+    def parse_all(self, fragments: Iterable[str]) -> List[Course]:
+        return [c for c in (self.parse(raw) for raw in fragments) if c is not None]
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits}/{self.lookups} hit(s) ({self.hit_rate:.0%}), "
+            f"{len(self._entries)} entries, {self._total_bytes / 1024:.0f} KiB, "
+            f"{self.evictions} eviction(s)"
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> None:
+        if not self.cache_dir.exists():
+            return
+
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            self._entries[path.stem] = _Entry(size=stat.st_size, last_used=stat.st_mtime)
+            self._total_bytes += stat.st_size
+
+        with self._lock:
+            self._evict()
+
+    def _get(self, key: str) -> Tuple[bool, Optional[Course]]:
+        path = self._path_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            course = (
+                Course.model_validate(record["course"])
+                if record["course"] is not None
+                else None
+            )
+        except FileNotFoundError:
+            return False, None
+        except (ValueError, KeyError, TypeError):
+            # a torn or stale record is just a miss, it gets overwritten below
+            return False, None
+
+        # mtime doubles as the lru clock so recency survives across runs
+        try:
+            os.utime(path)
+            last_used = path.stat().st_mtime
+        except FileNotFoundError:
+            return True, course
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = last_used
+
+        return True, course
+
+    def _put(self, key: str, course: Optional[Course]) -> None:
+        # non-course fragments are cached too so they are never re-parsed
+        record = {"course": course.model_dump(mode="json") if course else None}
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # write-then-rename so concurrent workers never read half a record
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._total_bytes -= previous.size
+            self._entries[key] = _Entry(size=len(payload), last_used=path.stat().st_mtime)
+            self._total_bytes += len(payload)
+            self._evict()
+
+    def _evict(self) -> None:
+        if len(self._entries) <= self.max_entries and self._total_bytes <= self.max_bytes:
+            return
+
+        for key in sorted(self._entries, key=lambda k: self._entries[k].last_used):
+            if len(self._entries) <= self.max_entries and self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+            PARSE_CACHE_EVICTIONS.inc()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        try:
+            self._path_for(key).unlink()
+        except FileNotFoundError:
+            # another process evicted it first
+            pass
+
+
+def test() -> None:
+    import tempfile
+    import time
+
+    from bs4 import BeautifulSoup
+
+    from parser import COURSE_DIV_SELECTOR
+    from synthetic_schedule import generate_schedule_page
+
+    page = generate_schedule_page(courses=60, batches=3, timing_lines=2, seed=7)
+    fragments = [
+        str(div) for div in BeautifulSoup(page, "html.parser").select(COURSE_DIV_SELECTOR)
+    ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = Path(temp_dir)
+
+        started_at = time.perf_counter()
+        cold = ParseCache(cache_dir)
+        cold_courses = cold.parse_all(fragments)
+        cold_sec = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        warm = ParseCache(cache_dir)
+        warm_courses = warm.parse_all(fragments)
+        warm_sec = time.perf_counter() - started_at
+
+        print(f"Cold run: {cold_sec * 1000:.1f} ms | {cold.summary()}")
+        print(f"Warm run: {warm_sec * 1000:.1f} ms | {warm.summary()}")
+        print(f"Warm courses match cold courses: {warm_courses == cold_courses}")
+
+        bounded = ParseCache(cache_dir, max_entries=10)
+        print(f"Bounded to 10 entries: {bounded.summary()}")
+
+        from metrics import REGISTRY
+
+        for line in REGISTRY.render().splitlines():
+            if line.startswith("unisync_parse_cache_"):
+                print(f"  {line}")
+
+
+if __name__ == "__main__":
+    test()
@@ -1,10 +1,22 @@
+import functools
 import re
 from bs4 import BeautifulSoup, Tag
 from datetime import date
-from typing import Dict, Final, List, Optional, Tuple, Union
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.html import HtmlElement
+from typing import Callable, Dict, Final, FrozenSet, List, Optional, Tuple, Union
 
-from config import AppConfig
+from config import get_app_config
 from models.course import Course, CourseBatch, Timing, ComponentType, Day
+from metrics import PARSE_RESULTS
+from tracing import traced
+
+# bump whenever a change to the parser alters the courses it produces
+PARSER_VERSION: Final[str] = "2"
+
+# every course on the weekly schedule page sits in one of these divs
+COURSE_DIV_SELECTOR: Final[str] = 'div[id*="DERIVED_REGFRM1_DESCR20"]'
 
 HEADER_RE = re.compile(r"([A-Z]{3}\d{3,4})\s*-\s*(.+)")
 COMPONENT_RE = re.compile(r"\b([LTP])(\d+)\b")
@@ -26,11 +38,45 @@ DAY_MAP: Final[Dict[str, Day]] = {
     "Su": Day.SUNDAY,
 }
 
-APP_CONFIG = AppConfig.from_toml()
+# xpath twins of the css selectors used on the soup path, compiled once
+COURSE_DIV_XPATH = etree.XPath("//div[contains(@id, 'DERIVED_REGFRM1_DESCR20')]")
+HEADER_XPATH = etree.XPath(
+    "(.//td[contains(concat(' ', normalize-space(@class), ' '), ' PAGROUPDIVIDER ')])[1]"
+)
+STATUS_XPATH = etree.XPath("(.//span[starts-with(@id, 'STATUS$')])[1]")
+BATCH_XPATH = etree.XPath(".//tr[starts-with(@id, 'trCLASS_MTG_VW')]")
+COMPONENT_XPATH = etree.XPath("(.//a[starts-with(@id, 'MTG_SECTION$')])[1]")
+TIMING_XPATH = etree.XPath("(.//span[starts-with(@id, 'MTG_SCHED$')])[1]")
+VENUE_XPATH = etree.XPath("(.//span[starts-with(@id, 'MTG_LOC$')])[1]")
+DATES_XPATH = etree.XPath("(.//span[starts-with(@id, 'MTG_DATES$')])[1]")
+
+NON_TEXT_TAGS: Final[FrozenSet[str]] = frozenset(
+    {"script", "style", "template", "rt", "rp"}
+)
+
+APP_CONFIG = get_app_config()
+
+
+def _count_results(
+    parser: str,
+) -> Callable[[Callable[[str], Optional[Course]]], Callable[[str], Optional[Course]]]:
+    # a None from the parser is a course div we failed to read, worth alerting on
+    def decorator(func: Callable[[str], Optional[Course]]) -> Callable[[str], Optional[Course]]:
+        @functools.wraps(func)
+        def wrapper(raw_html: str) -> Optional[Course]:
+            course = func(raw_html)
+            PARSE_RESULTS.inc(parser=parser, result="miss" if course is None else "ok")
+            return course
+
+        return wrapper
+
+    return decorator
 
 
 class HTMLToCourseParser:
     @staticmethod
+    @traced("parse_raw_html", "parse")
+    @_count_results("bs4")
     def parse_raw_html(raw_html: str) -> Optional[Course]:
         soup = BeautifulSoup(raw_html, "html.parser")
 
@@ -54,28 +100,104 @@ class HTMLToCourseParser:
         )
 
     @staticmethod
-    def _parse_header(soup: BeautifulSoup) -> Optional[Tuple[str, str]]:
-        header_td = soup.select_one("td.PAGROUPDIVIDER")
+    @traced("parse_page", "parse")
+    def parse_page(raw_html: str) -> List[Course]:
+        if not raw_html.strip():
+            return []
+
+        # one lxml parse for the whole page instead of one soup per course div
+        root = lxml_html.document_fromstring(raw_html)
+
+        courses: List[Course] = []
+        misses = 0
+        for course_div in COURSE_DIV_XPATH(root):
+            course = HTMLToCourseParser._parse_course_element(course_div)
+            if course is not None:
+                courses.append(course)
+            else:
+                misses += 1
+
+        PARSE_RESULTS.inc(len(courses), parser="lxml", result="ok")
+        PARSE_RESULTS.inc(misses, parser="lxml", result="miss")
+        return courses
+
+    @staticmethod
+    @traced("parse_fragment", "parse")
+    @_count_results("lxml")
+    def parse_fragment(raw_html: str) -> Optional[Course]:
+        # lxml twin of parse_raw_html for a single course div
+        if not raw_html.strip():
+            return None
+
+        root = lxml_html.document_fromstring(f"<html><body>{raw_html}</body></html>")
+        return HTMLToCourseParser._parse_course_element(root.body)
+
+    @staticmethod
+    def _parse_course_element(course_div: HtmlElement) -> Optional[Course]:
+        header_td = _first(HEADER_XPATH(course_div))
         if header_td is None:
             return None
 
-        raw_text = header_td.get_text(strip=True)
-        match_ = HEADER_RE.search(raw_text)
-        if match_ is None:
+        parsed_header = _header_from_text(_element_text(header_td))
+        if parsed_header is None:
             return None
+        course_code, course_title = parsed_header
 
-        course_code = match_.group(1)
-        course_title = match_.group(2)
+        status_span = _first(STATUS_XPATH(course_div))
+        if status_span is None:
+            return None
+        is_enrolled = _status_from_text(_element_text(status_span))
 
-        return course_code, course_title
+        course_batches: List[CourseBatch] = []
+        for batch_tr in BATCH_XPATH(course_div):
+            component_a = _first(COMPONENT_XPATH(batch_tr))
+            if component_a is None:
+                continue
+
+            timing_span = _first(TIMING_XPATH(batch_tr))
+            venue_span = _first(VENUE_XPATH(batch_tr))
+            dates_span = _first(DATES_XPATH(batch_tr))
+
+            course_batches.append(
+                _build_batch(
+                    component=_component_from_text(_element_text(component_a)),
+                    timings=(
+                        []
+                        if timing_span is None
+                        else _timings_from_text(
+                            _element_text(timing_span),
+                            _element_text(venue_span) if venue_span is not None else "TBA",
+                        )
+                    ),
+                    dates=(
+                        None
+                        if dates_span is None
+                        else _dates_from_text(_element_text(dates_span))
+                    ),
+                )
+            )
+
+        return Course(
+            course_code=course_code,
+            course_title=course_title,
+            is_enrolled=is_enrolled,
+            batches=course_batches,
+        )
+
+    @staticmethod
+    def _parse_header(soup: BeautifulSoup) -> Optional[Tuple[str, str]]:
+        header_td = soup.select_one("td.PAGROUPDIVIDER")
+        if header_td is None:
+            return None
+
+        return _header_from_text(header_td.get_text(strip=True))
 
     @staticmethod
     def _parse_status(soup: BeautifulSoup) -> Optional[bool]:
         status_span = soup.select_one('span[id^="STATUS$"]')
         if status_span is None:
             return None
-        is_enrolled = status_span.get_text(strip=True).lower() == "enrolled"
-        return is_enrolled
+        return _status_from_text(status_span.get_text(strip=True))
 
     @staticmethod
     def _parse_all_batches(soup: BeautifulSoup) -> List[CourseBatch]:
@@ -98,18 +220,8 @@ class HTMLToCourseParser:
         timings = HTMLToCourseParser._parse_timings(batch_tr)
 
         dates = HTMLToCourseParser._parse_dates(batch_tr)
-        if not dates:
-            start_date = APP_CONFIG.DEFAULT_START_DATE.isoformat()
-            end_date = APP_CONFIG.DEFAULT_END_DATE.isoformat()
-        else:
-            start_date, end_date = dates[0].isoformat(), dates[1].isoformat()
 
-        return CourseBatch(
-            component=component,
-            timings=timings,
-            start_date=start_date,
-            end_date=end_date,
-        )
+        return _build_batch(component, timings, dates)
 
     @staticmethod
     def _parse_component(
@@ -119,57 +231,18 @@ class HTMLToCourseParser:
         if not component_a:
             return None
 
-        raw_text = component_a.get_text(strip=True).upper()
-        match_ = COMPONENT_RE.search(raw_text)
-        if not match_:
-            return raw_text
-
-        code, number = match_.groups()
-        return ComponentType[code], int(number)
+        return _component_from_text(component_a.get_text(strip=True))
 
     @staticmethod
     def _parse_timings(batch_tr: Tag) -> List[Timing]:
-        timings: List[Timing] = []
-
         timing_span = batch_tr.select_one('span[id^="MTG_SCHED$"]')
         if timing_span is None:
-            return timings
+            return []
 
         venue_span = batch_tr.select_one('span[id^="MTG_LOC$"]')
-
-        timing_lines = timing_span.get_text(strip=True).splitlines()
-
         venue_text = venue_span.get_text(strip=True) if venue_span else "TBA"
-        if venue_text == "TBA":
-            venue_lines = ["TBA"] * len(timing_lines)
-        else:
-            venue_lines = venue_text.splitlines()
-
-        for timing_line, venue in zip(timing_lines, venue_lines):
-            match_ = TIME_RE.search(timing_line)
-            if not match_:
-                continue
-
-            days_block = match_.group("days")
-            start_time = to_24h(match_.group("start"))
-            end_time = to_24h(match_.group("end"))
-
-            day_tokens = DAY_TOKEN_RE.findall(days_block)
-            days = [DAY_MAP[token] for token in day_tokens]
-
-            try:
-                timings.append(
-                    Timing(
-                        start_time=start_time,
-                        end_time=end_time,
-                        days=days,
-                        venue=venue,
-                    )
-                )
-            except Exception:
-                pass
 
-        return timings
+        return _timings_from_text(timing_span.get_text(strip=True), venue_text)
 
     @staticmethod
     def _parse_dates(batch_tr: Tag) -> Optional[Tuple[date, date]]:
@@ -177,25 +250,136 @@ class HTMLToCourseParser:
         if not dates_span:
             return None
 
-        try:
-            raw_text = dates_span.get_text(strip=True)
+        return _dates_from_text(dates_span.get_text(strip=True))
 
-            match_ = DATES_RE.fullmatch(raw_text)
 
-            if not match_:
-                return None
+def _header_from_text(raw_text: str) -> Optional[Tuple[str, str]]:
+    match_ = HEADER_RE.search(raw_text)
+    if match_ is None:
+        return None
+
+    course_code = match_.group(1)
+    course_title = match_.group(2)
+
+    return course_code, course_title
+
+
+def _status_from_text(raw_text: str) -> bool:
+    return raw_text.lower() == "enrolled"
 
-            start_day, start_month, start_year, end_day, end_month, end_year = map(
-                int, match_.groups()
-            )
 
-            start_date = date(start_year, start_month, start_day)
-            end_date = date(end_year, end_month, end_day)
+def _component_from_text(raw_text: str) -> Union[Tuple[ComponentType, int], str]:
+    raw_text = raw_text.upper()
+    match_ = COMPONENT_RE.search(raw_text)
+    if not match_:
+        return raw_text
 
-            return start_date, end_date
+    code, number = match_.groups()
+    return ComponentType[code], int(number)
+
+
+def _timings_from_text(timing_text: str, venue_text: str) -> List[Timing]:
+    timings: List[Timing] = []
+
+    timing_lines = timing_text.splitlines()
+
+    if venue_text == "TBA":
+        venue_lines = ["TBA"] * len(timing_lines)
+    else:
+        venue_lines = venue_text.splitlines()
+
+    for timing_line, venue in zip(timing_lines, venue_lines):
+        match_ = TIME_RE.search(timing_line)
+        if not match_:
+            continue
+
+        days_block = match_.group("days")
+        start_time = to_24h(match_.group("start"))
+        end_time = to_24h(match_.group("end"))
+
+        day_tokens = DAY_TOKEN_RE.findall(days_block)
+        days = [DAY_MAP[token] for token in day_tokens]
+
+        try:
+            timings.append(
+                Timing(
+                    start_time=start_time,
+                    end_time=end_time,
+                    days=days,
+                    venue=venue,
+                )
+            )
         except Exception:
+            pass
+
+    return timings
+
+
+def _dates_from_text(raw_text: str) -> Optional[Tuple[date, date]]:
+    try:
+        match_ = DATES_RE.fullmatch(raw_text)
+
+        if not match_:
             return None
 
+        start_day, start_month, start_year, end_day, end_month, end_year = map(
+            int, match_.groups()
+        )
+
+        start_date = date(start_year, start_month, start_day)
+        end_date = date(end_year, end_month, end_day)
+
+        return start_date, end_date
+    except Exception:
+        return None
+
+
+def _build_batch(
+    component: Union[Tuple[ComponentType, int], str],
+    timings: List[Timing],
+    dates: Optional[Tuple[date, date]],
+) -> CourseBatch:
+    if not dates:
+        start_date = APP_CONFIG.DEFAULT_START_DATE.isoformat()
+        end_date = APP_CONFIG.DEFAULT_END_DATE.isoformat()
+    else:
+        start_date, end_date = dates[0].isoformat(), dates[1].isoformat()
+
+    return CourseBatch(
+        component=component,
+        timings=timings,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+def _first(elements: List[HtmlElement]) -> Optional[HtmlElement]:
+    return elements[0] if elements else None
+
+
+def _element_text(element: HtmlElement) -> str:
+    # mirrors bs4's get_text(strip=True): stripped text nodes joined with nothing,
+    # comments and script/style bodies left out, tails inside the subtree kept
+    parts: List[str] = []
+    _collect_text(element, parts)
+    return "".join(parts)
+
+
+def _collect_text(element: HtmlElement, parts: List[str]) -> None:
+    text = (element.text or "").strip()
+    if text:
+        parts.append(text)
+
+    for child in element:
+        # bs4 leaves out comments, processing instructions and anything nested in
+        # script/style/template/ruby tags, but the text after them still counts
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            _collect_text(child, parts)
+
+        tail = (child.tail or "").strip()
+        if tail:
+            parts.append(tail)
+
 
 def to_24h(t: str) -> str:
     hour, minute = map(int, t[:-2].split(":"))
@@ -237,6 +421,12 @@ def test() -> None:
             print(course.pretty_str())
         print()
 
+    per_div_courses = [
+        c for c in map(HTMLToCourseParser.parse_raw_html, raw_div_html_list) if c
+    ]
+    page_courses = HTMLToCourseParser.parse_page(raw_html)
+    print(f"parse_page matches per-div parser: {page_courses == per_div_courses}")
+
 
 if __name__ == "__main__":
     test()
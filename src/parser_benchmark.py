@@ -0,0 +1,253 @@
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, List, Optional
+
+from parser import COURSE_DIV_SELECTOR, HTMLToCourseParser
+from synthetic_schedule import generate_schedule_page
+
+RESULTS_PATH: Final[Path] = Path("data/bench/parser-results.jsonl")
+
+
+@dataclass(frozen=True)
+class BenchParams:
+    courses: int
+    batches: int
+    timing_lines: int
+    tba_ratio: float
+    seed: int
+    repeat: int
+
+
+@dataclass(frozen=True)
+class StageResult:
+    name: str
+    best_sec: float
+    items: int
+
+    @property
+    def items_per_sec(self) -> float:
+        return self.items / self.best_sec if self.best_sec else 0.0
+
+
+def run_benchmark(params: BenchParams) -> Dict[str, Any]:
+    page = generate_schedule_page(
+        courses=params.courses,
+        batches=params.batches,
+        timing_lines=params.timing_lines,
+        tba_ratio=params.tba_ratio,
+        seed=params.seed,
+    )
+    course_divs = [
+        str(div) for div in BeautifulSoup(page, "html.parser").select(COURSE_DIV_SELECTOR)
+    ]
+
+    # stage inputs are built up front so each stage is timed on its own
+    soups = [BeautifulSoup(div, "html.parser") for div in course_divs]
+    batch_trs = [tr for soup in soups for tr in soup.select('tr[id^="trCLASS_MTG_VW"]')]
+
+    stages: List[StageResult] = [
+        _time_stage(
+            "end_to_end.per_div",
+            params.repeat,
+            len(course_divs),
+            lambda: [HTMLToCourseParser.parse_raw_html(div) for div in course_divs],
+        ),
+        _time_stage(
+            "end_to_end.page",
+            params.repeat,
+            len(course_divs),
+            lambda: HTMLToCourseParser.parse_page(page),
+        ),
+        _time_stage(
+            "soup",
+            params.repeat,
+            len(course_divs),
+            lambda: [BeautifulSoup(div, "html.parser") for div in course_divs],
+        ),
+        _time_stage(
+            "header",
+            params.repeat,
+            len(soups),
+            lambda: [HTMLToCourseParser._parse_header(soup) for soup in soups],
+        ),
+        _time_stage(
+            "status",
+            params.repeat,
+            len(soups),
+            lambda: [HTMLToCourseParser._parse_status(soup) for soup in soups],
+        ),
+        _time_stage(
+            "batches",
+            params.repeat,
+            len(soups),
+            lambda: [HTMLToCourseParser._parse_all_batches(soup) for soup in soups],
+        ),
+        _time_stage(
+            "timings",
+            params.repeat,
+            len(batch_trs),
+            lambda: [HTMLToCourseParser._parse_timings(tr) for tr in batch_trs],
+        ),
+        _time_stage(
+            "dates",
+            params.repeat,
+            len(batch_trs),
+            lambda: [HTMLToCourseParser._parse_dates(tr) for tr in batch_trs],
+        ),
+    ]
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "params": asdict(params),
+        "page_bytes": len(page.encode("utf-8")),
+        "peak_memory_bytes": {
+            "end_to_end.per_div": _peak_memory(
+                lambda: [HTMLToCourseParser.parse_raw_html(div) for div in course_divs]
+            ),
+            "end_to_end.page": _peak_memory(lambda: HTMLToCourseParser.parse_page(page)),
+        },
+        "stages": {
+            stage.name: {
+                "best_sec": stage.best_sec,
+                "items": stage.items,
+                "items_per_sec": stage.items_per_sec,
+            }
+            for stage in stages
+        },
+    }
+
+
+def _time_stage(
+    name: str, repeat: int, items: int, func: Callable[[], Any]
+) -> StageResult:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started_at)
+
+    # best of n is the least noisy figure to compare across commits
+    return StageResult(name=name, best_sec=min(timings), items=items)
+
+
+def _peak_memory(func: Callable[[], Any]) -> int:
+    # tracemalloc only sees python allocations, libxml2's own tree memory is not counted
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _git_commit() -> str:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def append_result(result: Dict[str, Any], path: Path = RESULTS_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def find_previous_result(
+    params: BenchParams, path: Path = RESULTS_PATH
+) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+
+    previous = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("params") == asdict(params):
+                previous = record
+
+    return previous
+
+
+def format_result(
+    result: Dict[str, Any], previous: Optional[Dict[str, Any]] = None
+) -> str:
+    lines = [
+        f"Commit {result['commit']} | {result['page_bytes'] / 1024:.0f} KiB page | "
+        f"params {result['params']}"
+    ]
+
+    for name, stage in result["stages"].items():
+        line = (
+            f"  {name:<20} {stage['best_sec'] * 1000:>9.2f} ms "
+            f"{stage['items_per_sec']:>12.0f} items/s"
+        )
+        if previous is not None and name in previous["stages"]:
+            before = previous["stages"][name]["best_sec"]
+            if before:
+                change = (stage["best_sec"] - before) / before * 100
+                line += f"  {change:+6.1f}% vs {previous['commit']}"
+        lines.append(line)
+
+    for name, peak in result["peak_memory_bytes"].items():
+        lines.append(f"  peak memory {name:<20} {peak / 1024 / 1024:>7.2f} MiB")
+
+    return "\n".join(lines)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark HTMLToCourseParser on synthetic schedule pages"
+    )
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--timing-lines", type=int, default=2)
+    parser.add_argument("--tba-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=RESULTS_PATH,
+        help="JSON lines file results are appended to and compared against",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    params = BenchParams(
+        courses=args.courses,
+        batches=args.batches,
+        timing_lines=args.timing_lines,
+        tba_ratio=args.tba_ratio,
+        seed=args.seed,
+        repeat=args.repeat,
+    )
+
+    previous = find_previous_result(params, args.output)
+    result = run_benchmark(params)
+    append_result(result, args.output)
+
+    print(format_result(result, previous))
+
+
+if __name__ == "__main__":
+    main()
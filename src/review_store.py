@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Final, Iterable, Iterator, List, Optional, Set
+
+from models.course import CompactCourse, Course, REVIEW_FILE_PATH, read_courses_from_json
+
+REVIEW_STORE_PATH: Final[Path] = REVIEW_FILE_PATH.with_suffix(".jsonl")
+STORE_HEADER: Final[str] = "# review-store v1"
+# each record line is "<sha1 hex digest>\t<compact course json>"
+DIGEST_LENGTH: Final[int] = 40
+
+
+class ReviewRecord:
+    # the course is only validated the first time it is asked for
+    __slots__ = ("digest", "raw", "_course")
+
+    def __init__(self, digest: str, raw: str) -> None:
+        self.digest = digest
+        self.raw = raw
+        self._course: Optional[Course] = None
+
+    @property
+    def course(self) -> Course:
+        if self._course is None:
+            self._course = Course.model_validate_json(self.raw)
+        return self._course
+
+    # records were validated when written, bulk readers can skip pydantic
+    @property
+    def compact(self) -> CompactCourse:
+        return CompactCourse.from_dict(json.loads(self.raw))
+
+
+@dataclass(frozen=True)
+class StoreWriteStats:
+    written: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.written - self.unchanged
+
+
+class ReviewStore:
+    def __init__(self, path: Path = REVIEW_STORE_PATH) -> None:
+        self.path = path
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def write(self, courses: Iterable[Course]) -> StoreWriteStats:
+        previous = self.digests() if self.exists() else set()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+
+        written = 0
+        unchanged = 0
+        # one course per line, so nothing but the current record is ever held in memory
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(STORE_HEADER + "\n")
+            for course in courses:
+                raw = course.model_dump_json()
+                digest = record_digest(raw)
+                f.write(f"{digest}\t{raw}\n")
+
+                written += 1
+                unchanged += digest in previous
+
+        os.replace(temp_path, self.path)
+        return StoreWriteStats(written=written, unchanged=unchanged)
+
+    def records(self) -> Iterator[ReviewRecord]:
+        if not self.exists():
+            raise FileNotFoundError(f"Review store not found: {self.path}")
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip() or line.startswith("#"):
+                    continue
+
+                digest, sep, raw = line.rstrip("\n").partition("\t")
+                if not sep or len(digest) != DIGEST_LENGTH:
+                    raise ValueError(
+                        f"Invalid review store line {line_no} in {self.path}"
+                    )
+                yield ReviewRecord(digest, raw)
+
+    def digests(self) -> Set[str]:
+        # only the fixed-width digest column is kept, no record json is parsed
+        with open(self.path, "r", encoding="utf-8") as f:
+            return {
+                line[:DIGEST_LENGTH]
+                for line in f
+                if line.strip() and not line.startswith("#")
+            }
+
+    def courses(self) -> Iterator[Course]:
+        for record in self.records():
+            yield record.course
+
+    def compact_courses(self) -> Iterator[CompactCourse]:
+        for record in self.records():
+            yield record.compact
+
+    def import_json(self, path: Path = REVIEW_FILE_PATH) -> StoreWriteStats:
+        return self.write(read_courses_from_json(path))
+
+    def is_stale(self, path: Path = REVIEW_FILE_PATH) -> bool:
+        # the indented export was edited by hand after the store was last written
+        if not path.exists():
+            return False
+        if not self.exists():
+            return True
+        return path.stat().st_mtime > self.path.stat().st_mtime
+
+
+def record_digest(raw: str) -> str:
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def carry_over_edits(courses: List[Course], reviewed: Iterable[Course]) -> List[Course]:
+    # a re-scrape only knows erp's defaults, keep what the user set during review
+    reviewed_by_code: Dict[str, List[Course]] = {}
+    for course in reviewed:
+        reviewed_by_code.setdefault(course.course_code, []).append(course)
+
+    seen: Dict[str, int] = {}
+    for course in courses:
+        # erp can list a code twice, listings are matched up in order
+        index = seen.get(course.course_code, 0)
+        seen[course.course_code] = index + 1
+        listings = reviewed_by_code.get(course.course_code, [])
+        if index >= len(listings):
+            continue
+
+        old = listings[index]
+        course.is_enrolled = old.is_enrolled
+        course.course_shorthand = old.course_shorthand
+
+        colors = {batch.component: batch.event_color for batch in old.batches}
+        for batch in course.batches:
+            batch.event_color = colors.get(batch.component, batch.event_color)
+
+    return courses
+
+
+def test() -> None:
+    import tempfile
+    import time
+    import tracemalloc
+
+    from models.course import write_courses_to_json
+    from parser import HTMLToCourseParser
+    from synthetic_schedule import generate_schedule_page
+
+    cohort = [
+        course
+        for seed in range(200)
+        for course in HTMLToCourseParser.parse_page(
+            generate_schedule_page(courses=6, batches=2, timing_lines=2, seed=seed)
+        )
+    ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_path = Path(temp_dir) / "review-courses.json"
+        store = ReviewStore(Path(temp_dir) / "review-courses.jsonl")
+
+        started_at = time.perf_counter()
+        write_courses_to_json(cohort, json_path)
+        json_write_sec = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        stats = store.write(cohort)
+        store_write_sec = time.perf_counter() - started_at
+
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        loaded_json = read_courses_from_json(json_path)
+        json_read_sec = time.perf_counter() - started_at
+        _, json_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del loaded_json
+
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        enrolled = sum(course.is_enrolled for course in store.courses())
+        store_read_sec = time.perf_counter() - started_at
+        _, store_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        compact = [course for course in store.compact_courses() if course.is_enrolled]
+        compact_read_sec = time.perf_counter() - started_at
+        _, compact_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"{stats.written} course(s): json {json_path.stat().st_size // 1024} KiB, "
+            f"store {store.path.stat().st_size // 1024} KiB"
+        )
+        print(
+            f"  write: json {json_write_sec * 1000:.0f} ms, store {store_write_sec * 1000:.0f} ms"
+        )
+        print(
+            f"  read:  json {json_read_sec * 1000:.0f} ms / {json_peak / 1024 / 1024:.1f} MiB, "
+            f"store {store_read_sec * 1000:.0f} ms / {store_peak / 1024 / 1024:.1f} MiB "
+            f"({enrolled} enrolled)"
+        )
+        print(
+            f"  compact: {compact_read_sec * 1000:.0f} ms / {compact_peak / 1024 / 1024:.1f} MiB "
+            f"({len(compact)} enrolled)"
+        )
+
+        same = [c.model_dump() for c in store.courses()] == [c.model_dump() for c in cohort]
+        print(f"Round trip matches: {same}")
+        same = [c.to_course() for c in store.compact_courses()] == cohort
+        print(f"Compact round trip matches: {same}")
+
+        # edit one course in the human export and re-import it
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+        data[0]["is_enrolled"] = not data[0]["is_enrolled"]
+        json_path.write_text(json.dumps(data, indent=4), encoding="utf-8")
+
+        previous = store.digests()
+        stats = store.import_json(json_path)
+        # only the records whose digest changed are validated
+        changed = [r.course for r in store.records() if r.digest not in previous]
+        print(
+            f"Re-import: {stats.unchanged} unchanged, {stats.changed} changed "
+            f"-> {[c.course_code for c in changed]}"
+        )
+
+        # a fresh parse of the same timetable keeps the reviewed choices
+        reparsed = [Course.model_validate(c.model_dump()) for c in cohort[:1]]
+        reparsed[0].is_enrolled = not data[0]["is_enrolled"]
+        carried = carry_over_edits(reparsed, store.courses())
+        print(f"Carried over review edits: {carried[0].is_enrolled == data[0]['is_enrolled']}")
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+import tomllib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
+from typing import Dict, Final, List, Optional, Tuple, TYPE_CHECKING
+
+from config import ERPCredentials
+from metrics import REGISTRY, RegistrySnapshot
+
+if TYPE_CHECKING:
+    from driver_pool import ChromeDriverPool
+
+TENANTS_DATA_PATH: Final[Path] = Path("data/tenants")
+
+PROFILE_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class PoolKind(StrEnum):
+    PROCESS = "process"
+    THREAD = "thread"
+
+
+@dataclass(frozen=True)
+class StudentProfile:
+    name: str
+    credentials: ERPCredentials
+    data_dir: Path
+
+    @property
+    def review_store_path(self) -> Path:
+        return self.data_dir / "review-courses.jsonl"
+
+    @property
+    def cache_dir(self) -> Path:
+        return self.data_dir / "cache"
+
+
+@dataclass
+class TenantResult:
+    name: str
+    ok: bool = False
+    courses: int = 0
+    enrolled: int = 0
+    changed: int = 0
+    # the scraped timetable matched the stored fingerprint, nothing was parsed or synced
+    unchanged: bool = False
+    failed_operations: int = 0
+    error: Optional[str] = None
+    elapsed_sec: float = 0.0
+
+
+@dataclass
+class RosterReport:
+    results: List[TenantResult] = field(default_factory=list)
+    workers: int = 1
+    elapsed_sec: float = 0.0
+    driver_pool_summary: Optional[str] = None
+
+    @property
+    def succeeded(self) -> List[TenantResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[TenantResult]:
+        return [r for r in self.results if not r.ok]
+
+    def pretty_str(self) -> str:
+        lines = [
+            f"Roster: {len(self.succeeded)}/{len(self.results)} student(s) synced "
+            f"in {self.elapsed_sec:.1f}s on {self.workers} worker(s)"
+        ]
+
+        for r in self.results:
+            status = "OK" if r.ok else "FAILED"
+            if r.unchanged:
+                lines.append(f"  {r.name}: {status} | timetable unchanged | {r.elapsed_sec:.1f}s")
+                continue
+            line = (
+                f"  {r.name}: {status} | {r.enrolled}/{r.courses} enrolled | "
+                f"{r.changed} changed | "
+                f"{r.failed_operations} failed event(s) | {r.elapsed_sec:.1f}s"
+            )
+            if r.error:
+                line += f" | {r.error}"
+            lines.append(line)
+
+        if self.driver_pool_summary:
+            lines.append(f"Browser pool: {self.driver_pool_summary}")
+
+        return "\n".join(lines)
+
+
+def load_roster(path: Path, data_root: Path = TENANTS_DATA_PATH) -> List[StudentProfile]:
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+
+    entries = data.get("student")
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Roster file must define at least one [[student]] table")
+
+    profiles: List[StudentProfile] = []
+    seen: set[str] = set()
+
+    for entry in entries:
+        name = entry.get("name")
+        if not isinstance(name, str) or not PROFILE_NAME_RE.match(name):
+            raise ValueError(f"Invalid student name in roster: {name!r}")
+        if name in seen:
+            raise ValueError(f"Duplicate student name in roster: '{name}'")
+        seen.add(name)
+
+        netid = _resolve_secret(entry, "netid", name)
+        password = _resolve_secret(entry, "password", name)
+
+        data_dir = Path(entry["data_dir"]) if "data_dir" in entry else data_root / name
+        profiles.append(
+            StudentProfile(
+                name=name,
+                credentials=ERPCredentials(netid=netid, password=password),
+                data_dir=data_dir,
+            )
+        )
+
+    return profiles
+
+
+def _resolve_secret(entry: Dict, key: str, name: str) -> str:
+    # secrets may be inlined or, preferably, pulled from the environment
+    value = entry.get(key)
+    env_var = entry.get(f"{key}_env")
+
+    if value is None and env_var is not None:
+        value = os.getenv(env_var)
+
+    if not value:
+        raise ValueError(
+            f"Missing {key} for student '{name}'. Set '{key}' or '{key}_env' in the roster"
+        )
+
+    return value
+
+
+def run_profile(
+    profile: StudentProfile,
+    sync_mode: str = "batch",
+    driver_pool: Optional[ChromeDriverPool] = None,
+    fresh: bool = False,
+) -> TenantResult:
+    # imported here so process workers only pay for what they run
+    from main import scrape_course_divs
+    from review_store import ReviewStore
+    from schedule_tracker import FINGERPRINTS_DIR, ScheduleTracker
+    from snapshot import SNAPSHOTS_PATH
+    from sync_state import SYNC_STATE_PATH, SyncState
+    from synchronizer import CalendarSynchronizer, SyncMode
+
+    result = TenantResult(name=profile.name)
+    started_at = time.perf_counter()
+
+    try:
+        course_divs = scrape_course_divs(
+            profile.credentials,
+            driver_pool,
+            fresh,
+            snapshots_dir=profile.cache_dir / SNAPSHOTS_PATH.name,
+        )
+        tracker = ScheduleTracker(
+            profile.credentials.netid, profile.cache_dir / FINGERPRINTS_DIR.name
+        )
+        # a lost or emptied sync state means even an unchanged timetable is resynced in full
+        calendar_synced = bool(
+            SyncState.load(profile.cache_dir / SYNC_STATE_PATH.name).events
+        )
+        update = tracker.detect(course_divs, calendar_synced=calendar_synced)
+        # most tenants have the same timetable as last run, so they stop after the scrape
+        if not update.changed:
+            result.ok = result.unchanged = True
+            return result
+
+        # rosters get large, so tenants keep only the compact store and no indented export
+        ReviewStore(profile.review_store_path).write(update.courses)
+
+        # the whole timetable goes in, the synchronizer narrows it to the scope
+        enrolled_courses = [c for c in update.courses if c.is_enrolled]
+        result.courses = len(update.courses)
+        result.changed = (
+            len(update.courses) if update.scope is None else len(update.diff.changes)
+        )
+        result.enrolled = sum(c.is_enrolled for c in update.courses)
+
+        if update.scope or (update.scope is None and enrolled_courses):
+            synchronizer = CalendarSynchronizer(
+                cache_dir=profile.cache_dir, interactive=False
+            )
+            failures = synchronizer.synchronize(
+                enrolled_courses, mode=SyncMode(sync_mode), scope=update.scope
+            )
+            result.failed_operations = len(failures)
+            if synchronizer.dropped_scope:
+                # until a full sync lands, no later run may trust the stored fingerprint
+                tracker.invalidate()
+
+        # a failed sync keeps the old record, so the next run retries the same diff
+        if result.failed_operations == 0:
+            tracker.save(update)
+
+        result.ok = result.failed_operations == 0
+    except Exception as e:
+        result.error = str(e)
+    finally:
+        result.elapsed_sec = time.perf_counter() - started_at
+
+    return result
+
+
+def _run_profile_in_process(
+    profile: StudentProfile, sync_mode: str, fresh: bool
+) -> Tuple[TenantResult, RegistrySnapshot]:
+    # worker processes count into their own registry, handed back for the parent to merge
+    result = run_profile(profile, sync_mode, None, fresh)
+    return result, REGISTRY.snapshot(reset=True)
+
+
+def run_roster(
+    profiles: List[StudentProfile],
+    workers: int = 4,
+    pool: PoolKind = PoolKind.PROCESS,
+    sync_mode: str = "batch",
+    fresh: bool = False,
+) -> RosterReport:
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1. Recieved {workers}")
+
+    report = RosterReport(workers=workers)
+    started_at = time.perf_counter()
+
+    executor: Executor
+    driver_pool: Optional[ChromeDriverPool] = None
+    match pool:
+        case PoolKind.PROCESS:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        case PoolKind.THREAD:
+            from scraper import create_driver_pool
+
+            # threads can share warm browsers, processes each launch their own
+            driver_pool = create_driver_pool(size=workers)
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        with executor:
+            if pool == PoolKind.PROCESS:
+                futures = [
+                    executor.submit(_run_profile_in_process, profile, sync_mode, fresh)
+                    for profile in profiles
+                ]
+            else:
+                futures = [
+                    executor.submit(run_profile, profile, sync_mode, driver_pool, fresh)
+                    for profile in profiles
+                ]
+
+            # keep the report in roster order regardless of completion order
+            for profile, future in zip(profiles, futures):
+                try:
+                    if pool == PoolKind.PROCESS:
+                        result, worker_metrics = future.result()
+                        REGISTRY.merge(worker_metrics)
+                    else:
+                        result = future.result()
+                    report.results.append(result)
+                except Exception as e:
+                    report.results.append(TenantResult(name=profile.name, error=str(e)))
+    finally:
+        if driver_pool is not None:
+            driver_pool.close()
+            report.driver_pool_summary = driver_pool.metrics.summary()
+
+    report.elapsed_sec = time.perf_counter() - started_at
+    return report
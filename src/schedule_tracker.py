@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+import hashlib
+import html
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import StrEnum
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, Iterable, List, Optional, Set, Tuple
+
+from config import get_app_config
+from metrics import SCHEDULE_CHECKS
+from models.course import Course, CourseBatch
+
+APP_CONFIG = get_app_config()
+
+FINGERPRINTS_DIR: Final[Path] = Path("data/cache/fingerprints")
+FINGERPRINT_VERSION: Final[str] = "1"
+
+COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+TAG_RE = re.compile(r"<[^>]*>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+ParseFunc = Callable[[str], Optional[Course]]
+
+
+def normalize_course_div(raw_html: str) -> str:
+    # only the visible text feeds the parser, so markup, peoplesoft row ids like $3,
+    # entity spelling and whitespace differences between the two scrapers all drop out
+    text = TAG_RE.sub(" ", COMMENT_RE.sub("", raw_html))
+    return WHITESPACE_RE.sub(" ", html.unescape(text)).strip()
+
+
+def course_div_digest(raw_html: str) -> str:
+    return hashlib.sha256(normalize_course_div(raw_html).encode("utf-8")).hexdigest()
+
+
+def schedule_fingerprint(div_digests: Iterable[str]) -> str:
+    # sorted, so erp listing the same courses in a new order is not a change
+    digest = hashlib.sha256(FINGERPRINT_VERSION.encode("utf-8"))
+    for div_digest in sorted(div_digests):
+        digest.update(div_digest.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ChangeKind(StrEnum):
+    ADDED = "added"
+    DROPPED = "dropped"
+    MODIFIED = "modified"
+
+
+@dataclass(frozen=True)
+class FieldChange:
+    component: str
+    field: str
+    before: str
+    after: str
+
+    def pretty_str(self) -> str:
+        prefix = f"{self.component} " if self.component else ""
+        return f"{prefix}{self.field}: {self.before or '-'} -> {self.after or '-'}"
+
+
+@dataclass(frozen=True)
+class CourseChange:
+    course_code: str
+    kind: ChangeKind
+    changes: Tuple[FieldChange, ...] = ()
+
+    def pretty_str(self, indent: int = 0) -> str:
+        prefix = "    " * indent
+        lines = [f"{prefix}{self.kind.upper()} {self.course_code}"]
+        lines.extend(f"{prefix}    {change.pretty_str()}" for change in self.changes)
+        return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class ScheduleDiff:
+    changes: Tuple[CourseChange, ...] = ()
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.changes
+
+    @property
+    def course_codes(self) -> Set[str]:
+        return {change.course_code for change in self.changes}
+
+    def by_kind(self, kind: ChangeKind) -> List[CourseChange]:
+        return [change for change in self.changes if change.kind == kind]
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.by_kind(ChangeKind.ADDED))} added, "
+            f"{len(self.by_kind(ChangeKind.DROPPED))} dropped, "
+            f"{len(self.by_kind(ChangeKind.MODIFIED))} modified course(s)"
+        )
+
+    def pretty_str(self, indent: int = 0) -> str:
+        if self.is_empty:
+            return f"{'    ' * indent}No course changes"
+        return "\n".join(change.pretty_str(indent) for change in self.changes)
+
+
+@dataclass(frozen=True)
+class ScheduleRecord:
+    fingerprint: str
+    updated_at: datetime
+    # parser version and default dates the stored courses were parsed with
+    parser_key: str
+    # normalized div digest -> course dump, None for divs the parser could not read
+    courses: Dict[str, Optional[Dict[str, Any]]] = field(default_factory=dict)
+
+    @property
+    def has_enrolled(self) -> bool:
+        return any(dump is not None and dump["is_enrolled"] for dump in self.courses.values())
+
+
+@dataclass(frozen=True)
+class ScheduleUpdate:
+    fingerprint: str
+    changed: bool
+    # the whole current timetable, unchanged courses come from the stored record
+    courses: List[Course] = field(default_factory=list)
+    diff: ScheduleDiff = field(default_factory=ScheduleDiff)
+    # None means there is no earlier record to diff against, so sync everything
+    scope: Optional[Set[str]] = None
+    parsed_divs: int = 0
+    record: Optional[ScheduleRecord] = None
+
+
+class ScheduleTracker:
+    def __init__(
+        self,
+        netid: str,
+        fingerprints_dir: Path = FINGERPRINTS_DIR,
+        parse_func: Optional[ParseFunc] = None,
+    ) -> None:
+        # the parser pulls in bs4 and lxml, so importing this module stays cheap
+        from parser import HTMLToCourseParser, PARSER_VERSION
+
+        self.netid = netid
+        self.fingerprints_dir = fingerprints_dir
+        self.parse_func = parse_func or HTMLToCourseParser.parse_fragment
+        # same inputs as the parse cache key, anything that changes what a div parses to
+        self.parser_key = "|".join(
+            [
+                PARSER_VERSION,
+                APP_CONFIG.DEFAULT_START_DATE.isoformat(),
+                APP_CONFIG.DEFAULT_END_DATE.isoformat(),
+            ]
+        )
+
+    @property
+    def path(self) -> Path:
+        # hashed so account ids never end up in directory listings
+        account_key = hashlib.sha256(self.netid.strip().lower().encode("utf-8")).hexdigest()
+        return self.fingerprints_dir / f"{account_key[:16]}.json"
+
+    def load(self) -> Optional[ScheduleRecord]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # courses parsed by an older parser are not reused, the next run reparses everything
+            if data.get("parser_key") != self.parser_key:
+                return None
+            return ScheduleRecord(
+                fingerprint=data["fingerprint"],
+                updated_at=datetime.fromisoformat(data["updated_at"]),
+                parser_key=data["parser_key"],
+                courses=dict(data["courses"]),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            # a missing or corrupt record just means the next run syncs in full
+            return None
+
+    def save(self, update: ScheduleUpdate) -> None:
+        if update.record is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "fingerprint": update.record.fingerprint,
+                    "updated_at": update.record.updated_at.isoformat(),
+                    "parser_key": update.record.parser_key,
+                    "courses": update.record.courses,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(temp_path, self.path)
+
+    def invalidate(self) -> None:
+        # the next detect sees no record and hands over the whole timetable
+        self.path.unlink(missing_ok=True)
+
+    def detect(self, course_divs: List[str], calendar_synced: bool = True) -> ScheduleUpdate:
+        digests = [course_div_digest(raw) for raw in course_divs]
+        fingerprint = schedule_fingerprint(digests)
+
+        previous = self.load()
+        # the sync state was lost, so an unchanged timetable still has to go out in full
+        if previous is not None and not calendar_synced and previous.has_enrolled:
+            previous = None
+        if previous is not None and previous.fingerprint == fingerprint:
+            SCHEDULE_CHECKS.inc(result="unchanged")
+            return ScheduleUpdate(fingerprint=fingerprint, changed=False)
+
+        previous_courses = previous.courses if previous is not None else {}
+
+        # only divs whose normalized text is new get parsed
+        current: Dict[str, Optional[Dict[str, Any]]] = {}
+        parsed: List[Course] = []
+        courses: List[Course] = []
+        for digest, raw in zip(digests, course_divs):
+            if digest in current:
+                continue
+            if digest in previous_courses:
+                dump = previous_courses[digest]
+                current[digest] = dump
+                if dump is not None:
+                    courses.append(Course.model_validate(dump))
+                continue
+
+            course = self.parse_func(raw)
+            current[digest] = None if course is None else course.model_dump(mode="json")
+            if course is not None:
+                parsed.append(course)
+                courses.append(course)
+
+        # only codes behind new or vanished divs are diffed, the rest is never validated
+        affected = {c.course_code for c in parsed} | {
+            dump["course_code"]
+            for digest, dump in previous_courses.items()
+            if digest not in current and dump is not None
+        }
+        before = [
+            Course.model_validate(dump)
+            for dump in previous_courses.values()
+            if dump is not None and dump["course_code"] in affected
+        ]
+        after = [c for c in courses if c.course_code in affected]
+        diff = diff_courses(before, after)
+        SCHEDULE_CHECKS.inc(result="first" if previous is None else "changed")
+
+        return ScheduleUpdate(
+            fingerprint=fingerprint,
+            changed=True,
+            courses=courses,
+            diff=diff,
+            scope=None if previous is None else diff.course_codes,
+            parsed_divs=len(parsed),
+            record=ScheduleRecord(
+                fingerprint=fingerprint,
+                updated_at=datetime.now(timezone.utc),
+                parser_key=self.parser_key,
+                courses=current,
+            ),
+        )
+
+
+def diff_courses(before: List[Course], after: List[Course]) -> ScheduleDiff:
+    # erp can list one course code more than once, so listings are grouped per code
+    old_by_code = _group_by_code(before)
+    new_by_code = _group_by_code(after)
+
+    changes: List[CourseChange] = []
+    for code in sorted(old_by_code.keys() | new_by_code.keys()):
+        old = old_by_code.get(code)
+        new = new_by_code.get(code)
+
+        if not old:
+            changes.append(CourseChange(course_code=code, kind=ChangeKind.ADDED))
+        elif not new:
+            changes.append(CourseChange(course_code=code, kind=ChangeKind.DROPPED))
+        else:
+            field_changes = _diff_course(old, new)
+            # a div that only changed cosmetically leaves nothing to sync
+            if field_changes:
+                changes.append(
+                    CourseChange(
+                        course_code=code,
+                        kind=ChangeKind.MODIFIED,
+                        changes=tuple(field_changes),
+                    )
+                )
+
+    return ScheduleDiff(changes=tuple(changes))
+
+
+def _diff_course(old: List[Course], new: List[Course]) -> List[FieldChange]:
+    changes: List[FieldChange] = []
+
+    old_title, new_title = _title_str(old), _title_str(new)
+    if old_title != new_title:
+        changes.append(FieldChange("", "title", old_title, new_title))
+    old_status, new_status = _status_str(old), _status_str(new)
+    if old_status != new_status:
+        changes.append(FieldChange("", "status", old_status, new_status))
+
+    old_batches = _batches_by_component(old)
+    new_batches = _batches_by_component(new)
+
+    for component in sorted(old_batches.keys() | new_batches.keys()):
+        old_batch = old_batches.get(component)
+        new_batch = new_batches.get(component)
+
+        if old_batch is None:
+            changes.append(FieldChange(component, "component", "", "listed"))
+            continue
+        if new_batch is None:
+            changes.append(FieldChange(component, "component", "listed", ""))
+            continue
+
+        old_slots, new_slots = _slots_str(old_batch), _slots_str(new_batch)
+        if old_slots != new_slots:
+            changes.append(FieldChange(component, "timings", old_slots, new_slots))
+
+        old_venues, new_venues = _venues_str(old_batch), _venues_str(new_batch)
+        if old_venues != new_venues:
+            changes.append(FieldChange(component, "venue", old_venues, new_venues))
+
+        old_dates = f"{old_batch.start_date} - {old_batch.end_date}"
+        new_dates = f"{new_batch.start_date} - {new_batch.end_date}"
+        if old_dates != new_dates:
+            changes.append(FieldChange(component, "dates", old_dates, new_dates))
+
+    return changes
+
+
+def _group_by_code(courses: List[Course]) -> Dict[str, List[Course]]:
+    grouped: Dict[str, List[Course]] = {}
+    for course in courses:
+        grouped.setdefault(course.course_code, []).append(course)
+    return grouped
+
+
+def _batches_by_component(courses: List[Course]) -> Dict[str, CourseBatch]:
+    batches: Dict[str, CourseBatch] = {}
+    for batch in (batch for course in courses for batch in course.batches):
+        if isinstance(batch.component, tuple):
+            component_type, batch_num = batch.component
+            component = f"{component_type.value}{batch_num}"
+        else:
+            component = batch.component
+
+        # same numbering as the calendar event keys when a component repeats
+        key, occurrence = component, 1
+        while key in batches:
+            key = f"{component}#{occurrence}"
+            occurrence += 1
+        batches[key] = batch
+    return batches
+
+
+def _slots_str(batch: CourseBatch) -> str:
+    return ", ".join(
+        sorted(
+            f"{'/'.join(day.rrule for day in timing.days) or 'TBA'} "
+            f"{timing.start_time}-{timing.end_time}"
+            for timing in batch.timings
+        )
+    )
+
+
+def _venues_str(batch: CourseBatch) -> str:
+    return ", ".join(sorted({timing.venue for timing in batch.timings}))
+
+
+def _title_str(courses: List[Course]) -> str:
+    return " / ".join(sorted({course.course_title for course in courses}))
+
+
+def _status_str(courses: List[Course]) -> str:
+    return " / ".join(
+        sorted({"enrolled" if c.is_enrolled else "not enrolled" for c in courses})
+    )
+
+
+def test() -> None:
+    import tempfile
+    import time
+
+    from bs4 import BeautifulSoup
+
+    from parser import COURSE_DIV_SELECTOR, HTMLToCourseParser
+
+    # split the sample page the same way the http scraper does
+    page = Path("data/sample/sample-weekly-sched.html").read_text(encoding="utf-8")
+    soup = BeautifulSoup(page, "lxml")
+    course_divs = [str(div) for div in soup.select(COURSE_DIV_SELECTOR)]
+
+    parse_calls = 0
+
+    def counting_parse(raw_html: str) -> Optional[Course]:
+        nonlocal parse_calls
+        parse_calls += 1
+        return HTMLToCourseParser.parse_fragment(raw_html)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tracker = ScheduleTracker("stub", Path(temp_dir), parse_func=counting_parse)
+
+        first = tracker.detect(course_divs)
+        tracker.save(first)
+        print(
+            f"First run: {len(first.courses)} course(s), {first.parsed_divs} parsed, "
+            f"scope {'everything' if first.scope is None else first.scope}"
+        )
+
+        # same timetable, reordered and renumbered the way peoplesoft does it
+        reordered = [re.sub(r"\$\d+", "$9", div) for div in reversed(course_divs)]
+        started_at = time.perf_counter()
+        calls_before = parse_calls
+        same = tracker.detect(reordered)
+        print(
+            f"Unchanged run: changed={same.changed}, {parse_calls - calls_before} parse(s), "
+            f"{(time.perf_counter() - started_at) * 1000:.1f} ms"
+        )
+
+        # add/drop week: a section moves room and time, one course is dropped
+        moved = next(c for c in first.courses if c.batches and c.batches[0].timings)
+        timing = moved.batches[0].timings[0]
+        index = next(i for i, div in enumerate(course_divs) if moved.course_code in div)
+        edited = list(course_divs)
+        edited[index] = (
+            edited[index]
+            .replace(timing.venue, "Z999", 1)
+            .replace(timing.start_time, "07:00", 1)
+        )
+        dropped_code = first.courses[-1].course_code
+        edited = [div for div in edited if dropped_code not in div]
+
+        calls_before = parse_calls
+        update = tracker.detect(edited)
+        print(
+            f"Changed run: {update.diff.summary()}, "
+            f"{parse_calls - calls_before} parse(s), scope {sorted(update.scope or [])}"
+        )
+        print(update.diff.pretty_str(indent=1))
+
+        # the calendar lost its sync state, so the same timetable goes out in full
+        tracker.save(update)
+        lost = tracker.detect(edited, calendar_synced=False)
+        print(
+            f"After losing the sync state: changed={lost.changed}, "
+            f"scope {'everything' if lost.scope is None else lost.scope}"
+        )
+
+        # a parser fix invalidates the stored courses even though erp did not change
+        tracker.parser_key += "-fixed"
+        calls_before = parse_calls
+        reparsed = tracker.detect(edited)
+        print(
+            f"After a parser upgrade: changed={reparsed.changed}, "
+            f"{parse_calls - calls_before} parse(s), "
+            f"scope {'everything' if reparsed.scope is None else reparsed.scope}"
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -1,16 +1,61 @@
+import json
 from bs4 import BeautifulSoup, Tag
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Final, List, Union, cast
+from typing import Final, Iterator, List, Optional, Union, cast
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
-from config import AppConfig, ERPCredentials
+from config import get_app_config, ERPCredentials
+from driver_pool import ChromeDriverPool
+from parser import COURSE_DIV_SELECTOR
+from metrics import LOGIN_FAILURES, SCRAPE_SECONDS, SCRAPES
+from tracing import span
 
-APP_CONFIG = AppConfig.from_toml()
+APP_CONFIG = get_app_config()
+
+# nothing the scraper reads lives in these, so the lean profile never downloads them
+BLOCKED_URL_PATTERNS: Final[List[str]] = [
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.svg",
+    "*.ico",
+    "*.webp",
+    "*.css",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+]
+
+# evaluated in the page so every course div comes back in a single webdriver call,
+# returns null until the page has finished loading and the schedule is rendered
+COLLECT_COURSE_DIVS_SCRIPT: Final[str] = """
+if (document.readyState !== "complete") return null;
+const divs = document.querySelectorAll(arguments[0]);
+if (divs.length === 0) return null;
+return Array.from(divs, (div) => div.outerHTML);
+"""
+
+LEAN_CHROME_ARGUMENTS: Final[List[str]] = [
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-component-update",
+    "--no-first-run",
+    "--blink-settings=imagesEnabled=false",
+]
 
 
 class SNUERPScraper:
@@ -23,23 +68,35 @@ class SNUERPScraper:
         self,
         headless: bool = APP_CONFIG.RUN_HEADLESS_BROWSER_INSTANCE,
         timeout_sec: int = 15,
+        driver_pool: Optional[ChromeDriverPool] = None,
+        lean: bool = APP_CONFIG.SCRAPER_PROFILE == "lean",
     ) -> None:
+        self.headless = headless
         self.timeout_sec = timeout_sec
-        self.driver = self._create_driver(headless)
-        self.wait = WebDriverWait(self.driver, timeout=timeout_sec)
+        self.driver_pool = driver_pool
+        self.lean = lean
+        self.blocked_requests = 0
 
     def _create_driver(self, headless: bool) -> webdriver.Chrome:
-        options = Options()
-        if headless:
-            options.add_argument("--headless=new")
+        return create_chrome_driver(headless, self.lean)
 
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
+    @contextmanager
+    def _acquire_driver(self) -> Iterator[webdriver.Chrome]:
+        if self.driver_pool is not None:
+            with self.driver_pool.acquire() as driver:
+                yield cast(webdriver.Chrome, driver)
+            return
 
-        return webdriver.Chrome(options)
+        with span("chrome_launch", "scrape", headless=self.headless, lean=self.lean):
+            driver = self._create_driver(self.headless)
+        try:
+            yield driver
+        finally:
+            driver.quit()
 
     def _login(self, credentials: ERPCredentials) -> None:
-        self.driver.get(self.LOGIN_URL)
+        with span("login_page_load", "scrape"):
+            self.driver.get(self.LOGIN_URL)
 
         netid_input = self.driver.find_element(By.ID, "userid")
         password_input = self.driver.find_element(By.ID, "pwd")
@@ -54,29 +111,119 @@ class SNUERPScraper:
         submit_button.click()
 
         try:
-            self.wait.until(lambda driver: driver.current_url != self.LOGIN_URL)
+            with span("login_redirect_wait", "scrape"):
+                self.wait.until(lambda driver: driver.current_url != self.LOGIN_URL)
         except TimeoutException as exc:
+            LOGIN_FAILURES.inc(backend="browser")
             raise RuntimeError("Login failed. Please verify your credentials.") from exc
 
     def _get_course_divs(self) -> List[str]:
-        self.driver.get(self.WEEKLY_SCHEDULE_URL)
+        with span("schedule_page_load", "scrape"):
+            self.driver.get(self.WEEKLY_SCHEDULE_URL)
 
-        course_divs = self.driver.find_elements(
-            By.CSS_SELECTOR, 'div[id*="DERIVED_REGFRM1_DESCR20"]'
-        )
-        if not course_divs:
-            raise RuntimeError("Unable to grab course schedule divs")
+        try:
+            with span("collect_course_divs", "scrape"):
+                html_snippets = self.wait.until(
+                    lambda driver: driver.execute_script(
+                        COLLECT_COURSE_DIVS_SCRIPT, COURSE_DIV_SELECTOR
+                    )
+                )
+        except TimeoutException as exc:
+            raise RuntimeError("Unable to grab course schedule divs") from exc
 
-        html_snippets = [cd.get_attribute("outerHTML") for cd in course_divs]
         return [h for h in html_snippets if h]
 
-    def get_weekly_schedule_html(self) -> List[str]:
+    def get_weekly_schedule_html(
+        self, credentials: Optional[ERPCredentials] = None
+    ) -> List[str]:
+        credentials = credentials or ERPCredentials.from_env()
+
         try:
-            credentials = ERPCredentials.from_env()
-            self._login(credentials)
-            return self._get_course_divs()
-        finally:
-            self.driver.quit()
+            with (
+                span("browser_scrape", "scrape"),
+                SCRAPE_SECONDS.time(backend="browser"),
+                self._acquire_driver() as driver,
+            ):
+                self.driver = driver
+                self.wait = WebDriverWait(driver, timeout=self.timeout_sec)
+                if self.lean:
+                    # drop log entries left over from a previous scrape on a pooled driver
+                    count_blocked_requests(driver)
+
+                with span("erp_login", "scrape"):
+                    self._login(credentials)
+                with span("get_course_divs", "scrape"):
+                    course_divs = self._get_course_divs()
+
+                if self.lean:
+                    self.blocked_requests = count_blocked_requests(driver)
+                    print(f"Blocked {self.blocked_requests} non-essential request(s)")
+
+                SCRAPES.inc(backend="browser", result="ok")
+                return course_divs
+        except Exception:
+            SCRAPES.inc(backend="browser", result="error")
+            raise
+
+
+def create_chrome_driver(
+    headless: bool = APP_CONFIG.RUN_HEADLESS_BROWSER_INSTANCE,
+    lean: bool = APP_CONFIG.SCRAPER_PROFILE == "lean",
+) -> webdriver.Chrome:
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    if lean:
+        for argument in LEAN_CHROME_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+        # the performance log is how blocked requests get counted
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(options)
+
+    if lean:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+
+    return driver
+
+
+def count_blocked_requests(driver: webdriver.Chrome) -> int:
+    # reading the performance log drains it, so each call only sees new entries
+    try:
+        entries = driver.get_log("performance")
+    except WebDriverException:
+        return 0
+
+    blocked = 0
+    for entry in entries:
+        message = json.loads(entry["message"]).get("message", {})
+        if message.get("method") != "Network.loadingFailed":
+            continue
+        if message.get("params", {}).get("blockedReason"):
+            blocked += 1
+
+    return blocked
+
+
+def create_driver_pool(
+    size: int,
+    max_uses: int = 20,
+    headless: bool = APP_CONFIG.RUN_HEADLESS_BROWSER_INSTANCE,
+    lean: bool = APP_CONFIG.SCRAPER_PROFILE == "lean",
+) -> ChromeDriverPool:
+    return ChromeDriverPool(
+        driver_factory=lambda: create_chrome_driver(headless, lean),
+        size=size,
+        max_uses=max_uses,
+    )
 
 
 def write_weekly_schedule_to_html(
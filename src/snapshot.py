@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Final, List, Optional
+
+from config import get_app_config
+
+APP_CONFIG = get_app_config()
+
+SNAPSHOTS_PATH: Final[Path] = Path("data/cache/snapshots")
+SNAPSHOT_SUFFIX: Final[str] = ".json"
+DEFAULT_KEEP_SNAPSHOTS: Final[int] = 3
+
+
+@dataclass(frozen=True)
+class ScrapeSnapshot:
+    fetched_at: datetime
+    course_divs: List[str]
+    path: Path
+
+    @property
+    def age(self) -> timedelta:
+        return datetime.now(timezone.utc) - self.fetched_at
+
+    def is_fresh(self, ttl: timedelta) -> bool:
+        return self.age <= ttl
+
+
+class SnapshotStore:
+    def __init__(
+        self,
+        snapshots_dir: Path = SNAPSHOTS_PATH,
+        ttl: timedelta = timedelta(minutes=APP_CONFIG.SCRAPE_SNAPSHOT_TTL_MINUTES),
+        keep: int = DEFAULT_KEEP_SNAPSHOTS,
+    ) -> None:
+        if keep < 1:
+            raise ValueError(f"keep must be at least 1. Recieved {keep}")
+
+        self.snapshots_dir = snapshots_dir
+        self.ttl = ttl
+        self.keep = keep
+
+    def load_fresh(self, netid: str) -> Optional[ScrapeSnapshot]:
+        snapshot = self.load_latest(netid)
+        if snapshot is None or not snapshot.is_fresh(self.ttl):
+            return None
+        return snapshot
+
+    def load_latest(self, netid: str) -> Optional[ScrapeSnapshot]:
+        # newest first, a corrupt file just falls through to the one before it
+        for path in reversed(self._snapshot_paths(netid)):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                return ScrapeSnapshot(
+                    fetched_at=datetime.fromisoformat(data["fetched_at"]),
+                    course_divs=list(data["course_divs"]),
+                    path=path,
+                )
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        return None
+
+    def save(self, netid: str, course_divs: List[str]) -> ScrapeSnapshot:
+        fetched_at = datetime.now(timezone.utc)
+        account_dir = self._account_dir(netid)
+        account_dir.mkdir(parents=True, exist_ok=True)
+
+        path = account_dir / f"{fetched_at.strftime('%Y%m%dT%H%M%S%fZ')}{SNAPSHOT_SUFFIX}"
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"fetched_at": fetched_at.isoformat(), "course_divs": course_divs}, f
+            )
+        os.replace(temp_path, path)
+
+        for stale_path in self._snapshot_paths(netid)[: -self.keep]:
+            stale_path.unlink(missing_ok=True)
+
+        return ScrapeSnapshot(fetched_at=fetched_at, course_divs=course_divs, path=path)
+
+    def _account_dir(self, netid: str) -> Path:
+        # hashed so account ids never end up in directory listings
+        account_key = hashlib.sha256(netid.strip().lower().encode("utf-8")).hexdigest()
+        return self.snapshots_dir / account_key[:16]
+
+    def _snapshot_paths(self, netid: str) -> List[Path]:
+        account_dir = self._account_dir(netid)
+        if not account_dir.exists():
+            return []
+        # timestamped names sort chronologically
+        return sorted(account_dir.glob(f"*{SNAPSHOT_SUFFIX}"))
+
+
+def test() -> None:
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = SnapshotStore(Path(temp_dir), ttl=timedelta(minutes=30), keep=2)
+        print(f"Before any scrape: {store.load_fresh('stub')}")
+
+        for i in range(3):
+            store.save("stub", [f"<div>scrape {i}</div>"])
+
+        snapshot = store.load_fresh("stub")
+        assert snapshot is not None
+        print(f"Fresh snapshot: {snapshot.course_divs} ({snapshot.age.total_seconds():.2f}s old)")
+        print(f"Snapshots kept: {len(store._snapshot_paths('stub'))}")
+
+        expired = SnapshotStore(Path(temp_dir), ttl=timedelta(0))
+        print(f"With a zero TTL: {expired.load_fresh('stub')}")
+        print(f"Other account: {store.load_fresh('someone-else')}")
+
+
+if __name__ == "__main__":
+    test()
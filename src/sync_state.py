@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from enum import StrEnum
+from pathlib import Path
+from typing import AbstractSet, Any, cast, Dict, Final, List, Optional, Sequence, Union
+
+from googleapiclient.errors import HttpError
+
+from models.calendar_event import CalendarEvent, CompiledEvent
+
+SYNC_STATE_PATH: Final[Path] = Path("data/cache/sync_state.json")
+
+# statuses google returns for events that no longer exist on the calendar
+MISSING_EVENT_STATUSES: Final[frozenset[int]] = frozenset({404, 410})
+
+
+class OperationKind(StrEnum):
+    INSERT = "insert"
+    PATCH = "patch"
+    DELETE = "delete"
+
+
+@dataclass
+class SyncedEvent:
+    event_id: str
+    fingerprint: str
+
+
+@dataclass
+class SyncState:
+    calendar_id: Optional[str] = None
+    events: Dict[str, SyncedEvent] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path = SYNC_STATE_PATH) -> SyncState:
+        if not path.exists():
+            return cls()
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        return cls(
+            calendar_id=data.get("calendar_id"),
+            events={
+                key: SyncedEvent(**value)
+                for key, value in data.get("events", {}).items()
+            },
+        )
+
+    def save(self, path: Path = SYNC_STATE_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = {
+            "calendar_id": self.calendar_id,
+            "events": {
+                key: {"event_id": e.event_id, "fingerprint": e.fingerprint}
+                for key, e in sorted(self.events.items())
+            },
+        }
+
+        # write to a sibling file first so an interrupted run never leaves a truncated state
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        tmp_path.replace(path)
+
+    def apply(self, result: OperationResult) -> None:
+        op = result.operation
+
+        if result.error is not None:
+            # the remote copy vanished, forget it so the next run re-inserts it
+            if op.kind != OperationKind.INSERT and _is_missing(result.error):
+                self.events.pop(op.key, None)
+            return
+
+        match op.kind:
+            case OperationKind.INSERT:
+                event_id = cast(Dict[str, Any], result.response)["id"]
+                self.events[op.key] = SyncedEvent(event_id, op.fingerprint)
+            case OperationKind.PATCH:
+                self.events[op.key].fingerprint = op.fingerprint
+            case OperationKind.DELETE:
+                self.events.pop(op.key, None)
+
+
+@dataclass(frozen=True)
+class SyncOperation:
+    kind: OperationKind
+    key: str
+    body: Optional[Dict[str, Any]] = None
+    event_id: Optional[str] = None
+
+    @property
+    def fingerprint(self) -> str:
+        return fingerprint_body(self.body or {})
+
+
+@dataclass(frozen=True)
+class OperationResult:
+    operation: SyncOperation
+    response: Optional[Dict[str, Any]] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        # deleting an event that is already gone still leaves the calendar as intended
+        if self.error is None:
+            return True
+        return self.operation.kind == OperationKind.DELETE and _is_missing(self.error)
+
+
+@dataclass
+class SyncPlan:
+    operations: List[SyncOperation] = field(default_factory=list)
+    unchanged: int = 0
+
+    def count(self, kind: OperationKind) -> int:
+        return sum(1 for op in self.operations if op.kind == kind)
+
+    def summary(self) -> str:
+        return (
+            f"{self.count(OperationKind.INSERT)} insert(s), "
+            f"{self.count(OperationKind.PATCH)} patch(es), "
+            f"{self.count(OperationKind.DELETE)} delete(s), "
+            f"{self.unchanged} unchanged"
+        )
+
+
+def fingerprint_body(body: Dict[str, Any]) -> str:
+    encoded = json.dumps(body, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def compute_sync_plan(
+    events: Sequence[Union[CalendarEvent, CompiledEvent]],
+    state: SyncState,
+    scope: Optional[AbstractSet[str]] = None,
+) -> SyncPlan:
+    plan = SyncPlan()
+    seen: set[str] = set()
+
+    for event in events:
+        if event.key in seen:
+            raise ValueError(f"Duplicate calendar event key: '{event.key}'")
+        seen.add(event.key)
+
+        if isinstance(event, CompiledEvent):
+            body = event.body
+        else:
+            body = event.model_dump(mode="json")
+        synced = state.events.get(event.key)
+
+        if synced is None:
+            plan.operations.append(
+                SyncOperation(kind=OperationKind.INSERT, key=event.key, body=body)
+            )
+        elif synced.fingerprint != fingerprint_body(body):
+            plan.operations.append(
+                SyncOperation(
+                    kind=OperationKind.PATCH,
+                    key=event.key,
+                    body=body,
+                    event_id=synced.event_id,
+                )
+            )
+        else:
+            plan.unchanged += 1
+
+    for key, synced in sorted(state.events.items()):
+        # a scoped plan only got the changed courses, the rest of the calendar stays put
+        if scope is not None and event_course_code(key) not in scope:
+            continue
+        if key not in seen:
+            plan.operations.append(
+                SyncOperation(
+                    kind=OperationKind.DELETE, key=key, event_id=synced.event_id
+                )
+            )
+
+    return plan
+
+
+def event_course_code(key: str) -> str:
+    return key.split("|", 1)[0]
+
+
+def _is_missing(error: Exception) -> bool:
+    return isinstance(error, HttpError) and error.resp.status in MISSING_EVENT_STATUSES
+
+
+def test() -> None:
+    from utils import get_sample_course_list
+
+    courses = get_sample_course_list()
+    events = CalendarEvent.from_course_list(courses)
+
+    state = SyncState(calendar_id="sample")
+    plan = compute_sync_plan(events, state)
+    print(f"Fresh state: {plan.summary()}")
+
+    for i, op in enumerate(plan.operations):
+        state.apply(OperationResult(operation=op, response={"id": f"event-{i}"}))
+
+    courses[0].batches[1].timings[0].venue = "C318"
+    plan = compute_sync_plan(CalendarEvent.from_course_list(courses), state)
+    print(f"After moving one lab: {plan.summary()}")
+    for op in plan.operations:
+        print(f"  {op.kind} {op.key} -> {op.event_id}")
+
+    # only the moved course is handed over, nothing else on the calendar is deleted
+    changed_code = courses[0].course_code
+    plan = compute_sync_plan(
+        CalendarEvent.from_course_list(courses[:1]), state, scope={changed_code}
+    )
+    print(f"Scoped to {changed_code}: {plan.summary()}")
+
+
+if __name__ == "__main__":
+    test()
@@ -1,19 +1,53 @@
 import json
+import time
+from dataclasses import dataclass
+from enum import StrEnum
 from pathlib import Path
-from typing import cast, Final, List
+from typing import AbstractSet, cast, Dict, Final, List, Optional, Tuple
 from tqdm import tqdm
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from config import AppConfig, GoogleOAuthConfig
+from calendar_service import CalendarServiceFactory, get_service_factory
+from config import get_app_config, GoogleOAuthConfig
+from event_writer import ConcurrentEventWriter, is_retryable, RetryPolicy, TokenBucket
 from models.course import Course
-from models.calendar_event import CalendarEvent
+from models.calendar_event import EventCompiler
+from sync_state import (
+    compute_sync_plan,
+    OperationKind,
+    OperationResult,
+    SyncOperation,
+    SyncState,
+    SYNC_STATE_PATH,
+)
+from metrics import (
+    API_CALL_SECONDS,
+    API_CALLS,
+    API_RETRIES,
+    http_status_label,
+    SYNC_OPERATIONS,
+)
+from tracing import span
 
-APP_CONFIG = AppConfig.from_toml()
+APP_CONFIG = get_app_config()
+
+# calendar api rejects batch requests carrying more than 50 calls
+MAX_BATCH_SIZE: Final[int] = 50
+
+
+class SyncMode(StrEnum):
+    BATCH = "batch"
+    CONCURRENT = "concurrent"
+
+
+@dataclass(frozen=True)
+class SyncFailure:
+    operation: SyncOperation
+    error: Exception
 
 
 class CalendarSynchronizer:
@@ -24,18 +58,40 @@ class CalendarSynchronizer:
     TOKEN_PATH: Final[Path] = CACHE_DATA_PATH / "client_token.json"
     CALENDAR_DETAILS_PATH: Final[Path] = CACHE_DATA_PATH / "calendar_details.json"
 
-    def __init__(self) -> None:
-        self.CACHE_DATA_PATH.mkdir(parents=True, exist_ok=True)
-        self._service = self._initalize_service()
+    def __init__(
+        self, cache_dir: Path = CACHE_DATA_PATH, interactive: bool = True
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.token_path = cache_dir / self.TOKEN_PATH.name
+        self.calendar_details_path = cache_dir / self.CALENDAR_DETAILS_PATH.name
+        self.state_path = cache_dir / SYNC_STATE_PATH.name
+        # unattended runs must never block on a browser consent screen
+        self.interactive = interactive
+        # set when a scoped sync found no state to diff against and synced everything
+        self.dropped_scope = False
+        # shared by both write paths, batch items are retried in follow-up batches
+        self.retry_policy = RetryPolicy()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._services = self._initalize_service()
 
-    def _initalize_service(self):
+    def _initalize_service(self) -> CalendarServiceFactory:
         try:
-            credentials = self._get_credentials()
-            service = build("calendar", "v3", credentials=credentials)
-            return service
+            with span("oauth_credentials", "sync"):
+                credentials = self._get_credentials(self.token_path)
+            services = get_service_factory(str(self.token_path.resolve()), credentials)
+            # build the calling thread's service up front so its cost shows in the log
+            services.get()
+            print(f"Calendar service ready: {services.summary()}")
+            return services
         except Exception as e:
             raise RuntimeError("Failed to initialize calendar service:", e)
 
+    @property
+    def _service(self):
+        # each thread gets its own service, they all share one parsed discovery document
+        return self._services.get()
+
     def _get_credentials(
         self, token_path: Path = TOKEN_PATH, scopes: List[str] = SCOPES
     ) -> Credentials:
@@ -46,8 +102,14 @@ class CalendarSynchronizer:
 
         if not credentials or not credentials.valid:
             if credentials and credentials.expired and credentials.refresh_token:
-                credentials.refresh(Request())
+                with span("oauth_refresh", "sync"):
+                    credentials.refresh(Request())
             else:
+                if not self.interactive:
+                    raise RuntimeError(
+                        f"No valid OAuth token at {token_path}. Run an interactive sync first"
+                    )
+
                 if token_path.exists():
                     token_path.unlink()
 
@@ -75,9 +137,12 @@ class CalendarSynchronizer:
 
         return cast(Credentials, credentials)
 
-    def _get_calendar_id(
-        self, calendar_details_path: Path = CALENDAR_DETAILS_PATH
-    ) -> str:
+    def _get_calendar_id(self) -> str:
+        calendar_details_path = self.calendar_details_path
+        calendar_id = self._load_calendar_id(calendar_details_path)
+        if calendar_id is not None:
+            return calendar_id
+
         calendar = {"summary": self.CALENDAR_SUMMARY, "timeZone": APP_CONFIG.TIMEZONE}
 
         try:
@@ -91,19 +156,234 @@ class CalendarSynchronizer:
         except HttpError as e:
             raise RuntimeError(f"Failed to create calendar: {str(e)}")
 
-    def synchronize(self, course_list: List[Course]) -> None:
-        event_list = CalendarEvent.from_course_list(course_list)
+    def _load_calendar_id(self, calendar_details_path: Path) -> Optional[str]:
+        if not calendar_details_path.exists():
+            return None
+
+        with open(calendar_details_path, "r") as f:
+            calendar_id = json.load(f).get("calendar_id")
+
+        if not calendar_id:
+            return None
+
+        try:
+            self._service.calendars().get(calendarId=calendar_id).execute()
+        except HttpError as e:
+            # the calendar was deleted on google's side, a new one gets created
+            if e.resp.status in (404, 410):
+                return None
+            raise RuntimeError(f"Failed to fetch calendar: {str(e)}")
+
+        return calendar_id
+
+    def synchronize(
+        self,
+        course_list: List[Course],
+        mode: SyncMode = SyncMode.BATCH,
+        batch_size: int = MAX_BATCH_SIZE,
+        state_path: Optional[Path] = None,
+        scope: Optional[AbstractSet[str]] = None,
+    ) -> List[SyncFailure]:
+        if not 1 <= batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(
+                f"batch_size must be between 1 and {MAX_BATCH_SIZE}. Recieved {batch_size}"
+            )
+
+        state_path = state_path or self.state_path
+        with span("calendar_lookup", "sync"):
+            calendar_id = self._get_calendar_id()
+
+        state = SyncState.load(state_path)
+        if state.calendar_id != calendar_id:
+            state = SyncState(calendar_id=calendar_id)
+
+        # a new calendar or a lost state file holds none of the unchanged courses either
+        self.dropped_scope = scope is not None and not state.events
+        if self.dropped_scope:
+            print("Sync state is empty, syncing the whole timetable instead of the changes")
+            scope = None
+        if scope is not None:
+            course_list = [c for c in course_list if c.course_code in scope]
+
+        # courses reaching here were validated on load, so the compiled path is safe
+        with span("event_build", "sync", courses=len(course_list)):
+            event_list = EventCompiler().compile_course_list(course_list)
+
+        with span("sync_plan", "sync", events=len(event_list)):
+            plan = compute_sync_plan(event_list, state, scope=scope)
+        for operation in plan.operations:
+            SYNC_OPERATIONS.inc(kind=operation.kind)
+        print(f"Sync plan: {plan.summary()}")
+
+        match mode:
+            case SyncMode.BATCH:
+                results = self._apply_batched(
+                    calendar_id, plan.operations, state, state_path, batch_size
+                )
+            case SyncMode.CONCURRENT:
+                results = self._apply_concurrent(
+                    calendar_id, plan.operations, state, state_path
+                )
+
+        state.save(state_path)
+
+        failures = [
+            SyncFailure(operation=r.operation, error=cast(Exception, r.error))
+            for r in results
+            if not r.ok
+        ]
+        for failure in failures:
+            print(
+                f"Failed to {failure.operation.kind} event '{failure.operation.key}': {str(failure.error)}"
+            )
+
+        return failures
+
+    def _apply_batched(
+        self,
+        calendar_id: str,
+        operations: List[SyncOperation],
+        state: SyncState,
+        state_path: Path,
+        batch_size: int,
+    ) -> List[OperationResult]:
+        results: List[OperationResult] = []
+
+        with tqdm(total=len(operations), desc="Syncing calendar events") as progress:
+            for offset in range(0, len(operations), batch_size):
+                chunk = operations[offset : offset + batch_size]
+                results.extend(
+                    self._execute_with_retries(calendar_id, chunk, state, state_path)
+                )
+                progress.update(len(chunk))
+
+        return results
+
+    def _execute_with_retries(
+        self,
+        calendar_id: str,
+        operations: List[SyncOperation],
+        state: SyncState,
+        state_path: Path,
+    ) -> List[OperationResult]:
+        results: List[OperationResult] = []
+        pending = operations
+        attempt = 0
+
+        while pending:
+            attempt += 1
+            retry: List[SyncOperation] = []
+            for result in self._execute_batch(calendar_id, pending):
+                # rate limits and server errors fail single items inside a 200 batch
+                if (
+                    result.error is not None
+                    and attempt < self.retry_policy.max_attempts
+                    and is_retryable(result.error)
+                ):
+                    API_RETRIES.inc(status=http_status_label(result.error))
+                    retry.append(result.operation)
+                    continue
+                state.apply(result)
+                results.append(result)
+
+            # persist after every batch so a crash never orphans created events
+            state.save(state_path)
+
+            pending = retry
+            if pending:
+                time.sleep(self.retry_policy.delay(attempt))
+
+        return results
+
+    def _apply_concurrent(
+        self,
+        calendar_id: str,
+        operations: List[SyncOperation],
+        state: SyncState,
+        state_path: Path,
+    ) -> List[OperationResult]:
+        results: List[OperationResult] = []
+
+        writer = ConcurrentEventWriter(
+            request_factory=lambda op: self._build_request(calendar_id, op),
+            http_factory=self._services.http,
+            max_in_flight=APP_CONFIG.CALENDAR_MAX_IN_FLIGHT,
+            limiter=TokenBucket(rate_per_sec=APP_CONFIG.CALENDAR_REQUESTS_PER_SECOND),
+            retry_policy=self.retry_policy,
+        )
+
+        with tqdm(total=len(operations), desc="Syncing calendar events") as progress:
+
+            def _on_result(result: OperationResult) -> None:
+                state.apply(result)
+                results.append(result)
+                progress.update(1)
+
+                # same cadence as the batch path, a crash loses at most one batch worth
+                if len(results) % MAX_BATCH_SIZE == 0:
+                    state.save(state_path)
+
+            report = writer.write(operations, on_result=_on_result)
+
+        print(f"Write report: {report.summary()}")
+        return results
+
+    def _build_request(self, calendar_id: str, operation: SyncOperation):
+        events = self._service.events()
+
+        match operation.kind:
+            case OperationKind.INSERT:
+                return events.insert(calendarId=calendar_id, body=operation.body)
+            case OperationKind.PATCH:
+                return events.patch(
+                    calendarId=calendar_id,
+                    eventId=operation.event_id,
+                    body=operation.body,
+                )
+            case OperationKind.DELETE:
+                return events.delete(
+                    calendarId=calendar_id, eventId=operation.event_id
+                )
+
+    def _execute_batch(
+        self, calendar_id: str, operations: List[SyncOperation]
+    ) -> List[OperationResult]:
+        responses: Dict[str, Tuple[Optional[Dict], Optional[Exception]]] = {}
+
+        def _callback(request_id: str, response, exception: Optional[Exception]):
+            responses[request_id] = (response, exception)
+
+        batch = self._service.new_batch_http_request(callback=_callback)
+        for i, operation in enumerate(operations):
+            batch.add(
+                self._build_request(calendar_id, operation),
+                request_id=str(i),
+            )
+
+        try:
+            with (
+                span("calendar_batch", "sync", operations=len(operations)),
+                API_CALL_SECONDS.time(operation="batch"),
+            ):
+                batch.execute()
+        except Exception as e:
+            # the whole batch failed in transit, so every operation in it is lost
+            status = http_status_label(e)
+            for op in operations:
+                API_CALLS.inc(operation=op.kind, status=status)
+            return [OperationResult(operation=op, error=e) for op in operations]
 
-        calendar_id = self._get_calendar_id()
+        results: List[OperationResult] = []
+        for i, operation in enumerate(operations):
+            response, error = responses.get(
+                str(i), (None, RuntimeError("No response recieved for batch item"))
+            )
+            API_CALLS.inc(operation=operation.kind, status=http_status_label(error))
+            results.append(
+                OperationResult(operation=operation, response=response, error=error)
+            )
 
-        for event in tqdm(event_list, desc="Creating calendar events"):
-            try:
-                self._service.events().insert(
-                    calendarId=calendar_id, body=event.model_dump(mode="json")
-                ).execute()
-            except HttpError as e:
-                print(f"Failed to create event: {str(e)}")
-                print(f"Event: {event}")
+        return results
 
 
 def test() -> None:
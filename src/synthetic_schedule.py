@@ -0,0 +1,147 @@
+import copy
+import random
+from bs4 import BeautifulSoup, Tag
+from pathlib import Path
+from typing import Final, List, cast
+
+from parser import COURSE_DIV_SELECTOR
+
+SAMPLE_SCHED_PATH: Final[Path] = Path("data/sample/sample-weekly-sched.html")
+
+DAY_TOKENS: Final[List[str]] = ["Mo", "Tu", "We", "Th", "Fr", "Sa"]
+DEPARTMENTS: Final[List[str]] = ["CSD", "MAT", "PHY", "ECO", "CHY", "BIO", "EED", "HIS"]
+TITLE_WORDS: Final[List[str]] = [
+    "Advanced",
+    "Applied",
+    "Introduction",
+    "Systems",
+    "Theory",
+    "Learning",
+    "Design",
+    "Analysis",
+    "Networks",
+    "Markets",
+    "Methods",
+    "Structures",
+]
+VENUE_BLOCKS: Final[List[str]] = ["A", "B", "C", "D"]
+DURATIONS_MIN: Final[List[int]] = [55, 85, 115]
+
+
+def generate_schedule_page(
+    courses: int = 50,
+    batches: int = 3,
+    timing_lines: int = 2,
+    tba_ratio: float = 0.2,
+    seed: int = 0,
+    template_path: Path = SAMPLE_SCHED_PATH,
+) -> str:
+    rng = random.Random(seed)
+
+    template = BeautifulSoup(template_path.read_text(encoding="utf-8"), "html.parser")
+    template_div = template.select_one(COURSE_DIV_SELECTOR)
+    if template_div is None:
+        raise ValueError(f"No course div found in template: {template_path}")
+
+    template_tr = template_div.select_one('tr[id^="trCLASS_MTG_VW"]')
+    if template_tr is None:
+        raise ValueError(f"No batch row found in template: {template_path}")
+
+    page = BeautifulSoup("<html><body></body></html>", "html.parser")
+    body = cast(Tag, page.body)
+
+    row_index = 0
+    for course_index in range(courses):
+        course_div = copy.copy(template_div)
+        course_div["id"] = f"win0divDERIVED_REGFRM1_DESCR20${course_index}"
+
+        department = rng.choice(DEPARTMENTS)
+        title = " ".join(rng.sample(TITLE_WORDS, k=rng.randint(2, 4)))
+        _set_text(
+            course_div,
+            "td.PAGROUPDIVIDER",
+            f"{department} {department}{100 + course_index} - {title}",
+        )
+        _set_text(
+            course_div,
+            'span[id^="STATUS$"]',
+            "Enrolled" if rng.random() < 0.8 else "Dropped",
+        )
+
+        # swap the template's meeting rows for freshly generated ones
+        rows = course_div.select('tr[id^="trCLASS_MTG_VW"]')
+        grid_body = cast(Tag, rows[0].parent)
+        for row in rows:
+            row.decompose()
+
+        for batch_index in range(batches):
+            row = copy.copy(template_tr)
+            row["id"] = f"trCLASS_MTG_VW${course_index}_row{batch_index + 1}"
+
+            component = f"{rng.choice('LTP')}{batch_index + 1}"
+            lines = [_random_timing_line(rng) for _ in range(timing_lines)]
+            if rng.random() < tba_ratio:
+                venue = "TBA"
+            else:
+                venue = "\n".join(_random_venue(rng) for _ in range(timing_lines))
+
+            _set_text(row, 'a[id^="MTG_SECTION$"]', component)
+            _set_text(row, 'span[id^="MTG_SCHED$"]', "\n".join(lines))
+            _set_text(row, 'span[id^="MTG_LOC$"]', venue)
+            _set_text(row, 'span[id^="MTG_DATES$"]', "12/01/2026 - 28/04/2026")
+
+            for tag in row.select('[id*="$"]'):
+                # peoplesoft numbers meeting rows globally across the page
+                prefix = str(tag["id"]).rsplit("$", 1)[0]
+                if not prefix.startswith("trCLASS_MTG_VW"):
+                    tag["id"] = f"{prefix}${row_index}"
+            row_index += 1
+
+            grid_body.append(row)
+
+        body.append(course_div)
+
+    return str(page)
+
+
+def _set_text(root: Tag, selector: str, text: str) -> None:
+    tag = root.select_one(selector)
+    if tag is None:
+        raise ValueError(f"Template is missing '{selector}'")
+    tag.string = text
+
+
+def _random_timing_line(rng: random.Random) -> str:
+    days = "".join(sorted(rng.sample(DAY_TOKENS, k=rng.randint(1, 3)), key=DAY_TOKENS.index))
+
+    start_min = rng.randint(8 * 60, 17 * 60) // 5 * 5
+    end_min = start_min + rng.choice(DURATIONS_MIN)
+
+    return f"{days} {_to_12h(start_min)} - {_to_12h(end_min)}"
+
+
+def _random_venue(rng: random.Random) -> str:
+    return f"{rng.choice(VENUE_BLOCKS)}{rng.randint(100, 399)}(Lecture)"
+
+
+def _to_12h(minutes: int) -> str:
+    hour, minute = divmod(minutes, 60)
+    meridiem = "AM" if hour < 12 else "PM"
+    hour = hour % 12 or 12
+    return f"{hour}:{minute:02d}{meridiem}"
+
+
+def test() -> None:
+    from parser import HTMLToCourseParser
+
+    page = generate_schedule_page(courses=5, batches=2, timing_lines=2, seed=1)
+    courses = HTMLToCourseParser.parse_page(page)
+
+    print(f"Generated {len(page)} bytes, parsed {len(courses)} course(s)\n")
+    for course in courses[:2]:
+        print(course.pretty_str())
+        print()
+
+
+if __name__ == "__main__":
+    test()
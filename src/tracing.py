@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    Final,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# a watch daemon can run for weeks, so only the most recent spans are kept
+DEFAULT_MAX_SPANS: Final[int] = 200_000
+
+# handed out while tracing is off, so an untraced span costs one global lookup
+_NULL_SPAN: ContextManager[None] = nullcontext()
+
+
+class SpanRecord(NamedTuple):
+    name: str
+    category: str
+    start_ns: int
+    duration_ns: int
+    thread_id: int
+    thread_name: str
+    args: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class PhaseStats:
+    name: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    p95_ms: float
+    max_ms: float
+
+
+class Tracer:
+    def __init__(self, max_spans: int = DEFAULT_MAX_SPANS) -> None:
+        if max_spans < 1:
+            raise ValueError(f"max_spans must be at least 1. Recieved {max_spans}")
+
+        self.origin_ns = time.perf_counter_ns()
+        self.spans: Deque[SpanRecord] = deque(maxlen=max_spans)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str, args: Dict[str, Any]) -> Iterator[None]:
+        started_at = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException as e:
+            args = dict(args, error=type(e).__name__)
+            raise
+        finally:
+            thread = threading.current_thread()
+            record = SpanRecord(
+                name=name,
+                category=category,
+                start_ns=started_at - self.origin_ns,
+                duration_ns=time.perf_counter_ns() - started_at,
+                thread_id=thread.ident or 0,
+                thread_name=thread.name,
+                args=args,
+            )
+            with self._lock:
+                if len(self.spans) == self.spans.maxlen:
+                    self.dropped += 1
+                self.spans.append(record)
+
+    def phase_stats(self) -> List[PhaseStats]:
+        durations: Dict[str, List[float]] = {}
+        for record in self.spans:
+            durations.setdefault(record.name, []).append(record.duration_ns / 1e6)
+
+        stats: List[PhaseStats] = []
+        for name, values in durations.items():
+            values.sort()
+            stats.append(
+                PhaseStats(
+                    name=name,
+                    count=len(values),
+                    total_ms=sum(values),
+                    mean_ms=sum(values) / len(values),
+                    p95_ms=values[min(len(values) - 1, int(len(values) * 0.95))],
+                    max_ms=values[-1],
+                )
+            )
+
+        return sorted(stats, key=lambda s: s.total_ms, reverse=True)
+
+    def summary(self) -> str:
+        lines = [
+            f"{'phase':<28} {'count':>6} {'total ms':>10} {'mean ms':>9} "
+            f"{'p95 ms':>9} {'max ms':>9}"
+        ]
+        for s in self.phase_stats():
+            lines.append(
+                f"{s.name:<28} {s.count:>6} {s.total_ms:>10.1f} {s.mean_ms:>9.2f} "
+                f"{s.p95_ms:>9.2f} {s.max_ms:>9.2f}"
+            )
+        if self.dropped:
+            lines.append(f"({self.dropped} oldest span(s) dropped, only the latest are kept)")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+
+        thread_names: Dict[int, str] = {}
+        for record in self.spans:
+            thread_names.setdefault(record.thread_id, record.thread_name)
+            # complete events, timestamps and durations in microseconds
+            events.append(
+                {
+                    "name": record.name,
+                    "cat": record.category,
+                    "ph": "X",
+                    "ts": record.start_ns / 1000,
+                    "dur": record.duration_ns / 1000,
+                    "pid": pid,
+                    "tid": record.thread_id,
+                    "args": record.args,
+                }
+            )
+
+        for thread_id, thread_name in thread_names.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": thread_id,
+                    "args": {"name": thread_name},
+                }
+            )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: Path) -> None:
+        # opens in chrome://tracing or ui.perfetto.dev
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        os.replace(temp_path, path)
+
+
+_ACTIVE: Optional[Tracer] = None
+
+
+def start_tracing(max_spans: int = DEFAULT_MAX_SPANS) -> Tracer:
+    global _ACTIVE
+    _ACTIVE = Tracer(max_spans)
+    return _ACTIVE
+
+
+def stop_tracing() -> Optional[Tracer]:
+    global _ACTIVE
+    tracer, _ACTIVE = _ACTIVE, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _ACTIVE
+
+
+def span(name: str, category: str = "app", **args: Any) -> ContextManager[None]:
+    tracer = _ACTIVE
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, args)
+
+
+def traced(name: str, category: str = "app") -> Callable[[F], F]:
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = _ACTIVE
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.span(name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def test() -> None:
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    @traced("work", "test")
+    def work(ms: float) -> None:
+        time.sleep(ms / 1000)
+
+    started_at = time.perf_counter()
+    for _ in range(100_000):
+        with span("disabled"):
+            pass
+    print(f"100k disabled spans in {(time.perf_counter() - started_at) * 1000:.1f} ms")
+
+    tracer = start_tracing()
+    with span("run", "test", command="demo"):
+        with span("setup", "test"):
+            work(5)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(work, [2, 4, 6, 8, 10, 12]))
+        try:
+            with span("failing", "test"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+    stop_tracing()
+
+    print(tracer.summary())
+
+    capped = Tracer(max_spans=100)
+    for i in range(1000):
+        with capped.span("cycle", "test", {"cycle": i}):
+            pass
+    print(
+        f"Capped tracer: {len(capped.spans)} kept, {capped.dropped} dropped, "
+        f"oldest cycle {capped.spans[0].args['cycle']}"
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "trace.json"
+        tracer.write_chrome_trace(path)
+        trace = json.loads(path.read_text(encoding="utf-8"))
+        threads = {e["tid"] for e in trace["traceEvents"] if e["ph"] == "X"}
+        failed = [e["args"] for e in trace["traceEvents"] if e["name"] == "failing"]
+        print(
+            f"Trace: {len(trace['traceEvents'])} event(s) across {len(threads)} thread(s), "
+            f"failing span args {failed[0]}"
+        )
+
+
+if __name__ == "__main__":
+    test()
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import gc
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AbstractSet, Callable, List, Optional, TYPE_CHECKING
+
+from config import ERPCredentials, get_app_config
+from metrics import LAST_SCHEDULE_CHANGE, REGISTRY, WATCH_CYCLES
+from models.course import Course
+from schedule_tracker import FINGERPRINTS_DIR, ScheduleTracker
+from sync_state import SYNC_STATE_PATH
+from tracing import span
+from utils import log_error, log_info, log_success, log_warning
+
+if TYPE_CHECKING:
+    from driver_pool import ChromeDriverPool
+    from http_scraper import WeeklyScheduleScraper
+
+APP_CONFIG = get_app_config()
+
+ScraperFactory = Callable[[Optional["ChromeDriverPool"]], "WeeklyScheduleScraper"]
+
+
+@dataclass(frozen=True)
+class WatchCycle:
+    started_at: datetime
+    changed: bool = False
+    courses: int = 0
+    failed_operations: int = 0
+    error: Optional[str] = None
+    elapsed_sec: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.failed_operations == 0
+
+
+class ScheduleWatcher:
+    def __init__(
+        self,
+        credentials: Optional[ERPCredentials] = None,
+        interval: timedelta = timedelta(minutes=APP_CONFIG.WATCH_INTERVAL_MINUTES),
+        jitter: timedelta = timedelta(minutes=APP_CONFIG.WATCH_JITTER_MINUTES),
+        sync_mode: str = "batch",
+        metrics_path: Optional[Path] = APP_CONFIG.METRICS_TEXTFILE,
+        fingerprints_dir: Path = FINGERPRINTS_DIR,
+        scraper_factory: Optional[ScraperFactory] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if interval <= timedelta(0):
+            raise ValueError(f"interval must be positive. Recieved {interval}")
+        if jitter < timedelta(0):
+            raise ValueError(f"jitter must not be negative. Recieved {jitter}")
+
+        self.credentials = credentials or ERPCredentials.from_env()
+        self.interval = interval
+        self.jitter = jitter
+        self.sync_mode = sync_mode
+        self.metrics_path = metrics_path
+        self.scraper_factory = scraper_factory or _default_scraper_factory
+        self.rng = rng or random.Random()
+
+        # remembers the last timetable that made it into the calendar, across restarts
+        self.tracker = ScheduleTracker(self.credentials.netid, fingerprints_dir)
+        self.sync_state_path = SYNC_STATE_PATH
+        self.cycles = 0
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def next_delay(self) -> float:
+        # spread many watched accounts out instead of hitting erp on the same minute
+        return (
+            self.interval.total_seconds()
+            + self.rng.uniform(0, self.jitter.total_seconds())
+        )
+
+    def run(self, max_cycles: Optional[int] = None) -> None:
+        log_info(
+            f"Watching ERP every {self.interval} (+ up to {self.jitter} jitter). "
+            "Press Ctrl+C to stop"
+        )
+
+        completed = 0
+        while not self._stop.is_set():
+            cycle = self.run_cycle()
+            self._report(cycle)
+
+            completed += 1
+            if max_cycles is not None and completed >= max_cycles:
+                break
+
+            delay = self.next_delay()
+            log_info(f"Next check in {timedelta(seconds=round(delay))}")
+            # wakes early when stop() is called, e.g. from a signal handler
+            self._stop.wait(delay)
+
+    def run_cycle(self) -> WatchCycle:
+        started_at = datetime.now(timezone.utc)
+        timer = time.perf_counter()
+        self.cycles += 1
+
+        try:
+            with span("watch_cycle", "watch", cycle=self.cycles):
+                course_divs = self.scrape()
+                update = self.tracker.detect(
+                    course_divs, calendar_synced=self.calendar_synced()
+                )
+
+                # a div that only changed cosmetically is recorded but syncs nothing
+                if not update.changed or (update.scope is not None and update.diff.is_empty):
+                    if update.changed:
+                        self.tracker.save(update)
+                    WATCH_CYCLES.inc(result="unchanged")
+                    return WatchCycle(
+                        started_at=started_at, elapsed_sec=time.perf_counter() - timer
+                    )
+
+                if update.scope is not None:
+                    log_info(f"Timetable changed: {update.diff.summary()}")
+                    print(update.diff.pretty_str(indent=1))
+
+                courses = self.update_review_files(update.courses)
+                changed_courses = [
+                    c for c in courses if update.scope is None or c.course_code in update.scope
+                ]
+                # the whole timetable goes in, the synchronizer narrows it to the scope
+                failed_operations = self.sync_courses(courses, update.scope)
+
+            # a partly failed sync is retried on the next cycle even if erp stays the same
+            if failed_operations == 0:
+                self.tracker.save(update)
+                LAST_SCHEDULE_CHANGE.set(time.time())
+
+            WATCH_CYCLES.inc(result="changed")
+            return WatchCycle(
+                started_at=started_at,
+                changed=True,
+                courses=len(changed_courses),
+                failed_operations=failed_operations,
+                elapsed_sec=time.perf_counter() - timer,
+            )
+        except Exception as e:
+            WATCH_CYCLES.inc(result="error")
+            return WatchCycle(
+                started_at=started_at,
+                error=str(e),
+                elapsed_sec=time.perf_counter() - timer,
+            )
+        finally:
+            # drop anything the cycle left behind before sleeping for an hour
+            gc.collect()
+
+    def scrape(self) -> List[str]:
+        from scraper import create_driver_pool
+        from snapshot import SnapshotStore
+
+        # a browser only lives for one cycle, nothing idles in memory between checks
+        with create_driver_pool(size=1) as driver_pool:
+            scraper = self.scraper_factory(driver_pool)
+            course_divs = scraper.get_weekly_schedule_html(self.credentials)
+
+        SnapshotStore().save(self.credentials.netid, course_divs)
+        return course_divs
+
+    def update_review_files(self, courses: List[Course]) -> List[Course]:
+        from main import load_review_courses
+        from models.course import write_courses_to_json, REVIEW_FILE_PATH
+        from review_store import carry_over_edits, ReviewStore
+
+        store = ReviewStore()
+        # enrolment, shorthand and colour choices made during review survive the re-scrape
+        if store.exists() or REVIEW_FILE_PATH.exists():
+            courses = carry_over_edits(courses, load_review_courses())
+
+        # keep the review files current so export and clashes see the same timetable
+        write_courses_to_json(courses, REVIEW_FILE_PATH)
+        store.write(courses)
+        return courses
+
+    def calendar_synced(self) -> bool:
+        from sync_state import SyncState
+
+        # a local read, an emptied or deleted state file forces the next sync to be full
+        return bool(SyncState.load(self.sync_state_path).events)
+
+    def sync_courses(
+        self, courses: List[Course], scope: Optional[AbstractSet[str]] = None
+    ) -> int:
+        from synchronizer import CalendarSynchronizer, SyncMode
+
+        enrolled_courses = [c for c in courses if c.is_enrolled]
+        if not enrolled_courses and scope is None:
+            log_warning("No enrolled courses available for synchronization")
+
+        # with a scope only the changed courses are planned, dropped ones get their events deleted
+        synchronizer = CalendarSynchronizer(interactive=False)
+        failures = synchronizer.synchronize(
+            enrolled_courses, mode=SyncMode(self.sync_mode), scope=scope
+        )
+        if synchronizer.dropped_scope:
+            # until a full sync lands, no later cycle may trust the stored fingerprint
+            self.tracker.invalidate()
+        return len(failures)
+
+    def _report(self, cycle: WatchCycle) -> None:
+        if cycle.error is not None:
+            log_error(f"Watch cycle {self.cycles} failed: {cycle.error}")
+        elif not cycle.changed:
+            log_info(
+                f"Watch cycle {self.cycles}: timetable unchanged ({cycle.elapsed_sec:.1f}s)"
+            )
+        elif cycle.failed_operations:
+            log_warning(
+                f"Watch cycle {self.cycles}: {cycle.failed_operations} calendar event(s) "
+                "failed to sync, retrying next cycle"
+            )
+        else:
+            log_success(
+                f"Watch cycle {self.cycles}: timetable changed, {cycle.courses} changed "
+                f"course(s) synced ({cycle.elapsed_sec:.1f}s)"
+            )
+
+        if self.metrics_path is not None:
+            try:
+                REGISTRY.write_textfile(self.metrics_path)
+            except OSError as e:
+                log_warning(f"Could not write metrics to {self.metrics_path}: {str(e)}")
+
+
+def _default_scraper_factory(
+    driver_pool: Optional[ChromeDriverPool],
+) -> WeeklyScheduleScraper:
+    from http_scraper import create_scraper
+
+    return create_scraper(driver_pool=driver_pool)
+
+
+def test() -> None:
+    import tempfile
+
+    from erp_stub_server import ERPStubServer
+    from http_scraper import HTTPERPScraper
+
+    class OfflineWatcher(ScheduleWatcher):
+        # stands in for google calendar and the review files
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, **kwargs)
+            self.synced: List[int] = []
+            self.has_state = False
+
+        def update_review_files(self, courses: List[Course]) -> List[Course]:
+            return courses
+
+        def calendar_synced(self) -> bool:
+            return self.has_state
+
+        def sync_courses(
+            self, courses: List[Course], scope: Optional[AbstractSet[str]] = None
+        ) -> int:
+            self.synced.append(
+                len([c for c in courses if scope is None or c.course_code in scope])
+            )
+            self.has_state = True
+            return 0
+
+    with ERPStubServer() as server, tempfile.TemporaryDirectory() as temp_dir:
+        watcher = OfflineWatcher(
+            credentials=ERPCredentials(netid="stub", password="stub"),
+            interval=timedelta(milliseconds=50),
+            jitter=timedelta(milliseconds=20),
+            metrics_path=Path(temp_dir) / "unisync.prom",
+            fingerprints_dir=Path(temp_dir) / "fingerprints",
+            scraper_factory=lambda pool: HTTPERPScraper(
+                fallback_to_browser=False,
+                login_url=server.login_url,
+                schedule_url=server.schedule_url,
+                driver_pool=pool,
+            ),
+        )
+
+        watcher.run(max_cycles=2)
+
+        # add/drop: one course disappears from erp
+        server.schedule_html = server.schedule_html.replace("CSD366", "CSD399", 1)
+        watcher.run(max_cycles=2)
+
+        # the sync state file is lost while erp stays the same, the next cycle resyncs in full
+        watcher.has_state = False
+        watcher.run(max_cycles=1)
+
+        print(f"Cycles: {watcher.cycles}, syncs: {watcher.synced}")
+        print(f"Logins: {server.login_attempts}")
+        print(
+            f"Changed cycles: {WATCH_CYCLES.value(result='changed')}, "
+            f"unchanged: {WATCH_CYCLES.value(result='unchanged')}"
+        )
+
+
+if __name__ == "__main__":
+    test()